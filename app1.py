@@ -1,11 +1,13 @@
-from astropy.io import fits
 from dash import Dash, dcc, html, Input, Output
 
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
 import dash_bootstrap_components as dbc
-import sunpy.visualization.colormaps as cm
+
+from colortables import COLORMAPS
+from cubecache import scaled_sequence
+from display import DisplayTransform
+from framecache import FrameEncoder
+from metrics import instrument
+from playback import playback_layout, register_frames, register_playback, transform_query
 
 EXPLAINER = """This is a simple demo of a DASH application that is relevant for
 pyCAT.  It starts from a dash example and css template obtained from here:
@@ -19,15 +21,6 @@ https://github.com/tcbegley/dash-bootstrap-css"""
 # you can read in a series of fits images into a list or numpy array here 
 # before calling the application.  Then that list is available to you.
 
-def matplotlib_to_plotly(cmap, pl_entries):
-    h = 1.0/(pl_entries-1)
-    pl_colorscale = []
-
-    for k in range(pl_entries):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        pl_colorscale.append([k*h, 'rgb'+str((C[0], C[1], C[2]))])
-
-    return pl_colorscale
 #------------------------------------------------------------------------------
 # define images
 
@@ -46,112 +39,35 @@ files = [
     "STEREOA_L3_2012_09_16_143900.fts"
 ]
 
-imagelist = []
-for f in files:
-    fname = dir + '/' + f
-    hdu = fits.open(fname)[0]
-    imagelist.append(hdu.data)
-
-images = np.array(imagelist)
-
 #------------------------------------------------------------------------------
-# scaled integer images
+# scaled integer images, cached on disk between runs
+
+arrays, meta = scaled_sequence(dir, files, top=255)
 
-vmin = np.min(images)
-vmax = np.max(images)
-norm = 255.0/(vmax-vmin)
+vmin, vmax = meta['vmin'], meta['vmax']
 
 print(f"range {vmin} {vmax}")
 
-scaled_images = (norm*(images-vmin)).astype(np.uint8)
+scaled_images = arrays['cube']
 
 #------------------------------------------------------------------------------
 # define color scales
-cmap_lasco = plt.get_cmap('soholasco2')
-cmap_stereo = plt.get_cmap('stereocor2')
+names = list(COLORMAPS)
 
-cscale_lasco = matplotlib_to_plotly(cmap_lasco, 255)
-cscale_stereo = matplotlib_to_plotly(cmap_stereo, 255)
-
-names = ["LASCO/C2","STEREO/COR2"]
-
-scaledict = {names[0]: cscale_lasco,
-             names[1]: cscale_stereo}
+def display_transform(name):
+    # the cube is scaled to [0, 255], as was the 255 color heatmap
+    return DisplayTransform(COLORMAPS[name], cmax=255, top=255)
 
 #------------------------------------------------------------------------------
-# plot figure
-fig = px.imshow(scaled_images, animation_frame=0,
-                labels=dict(animation_frame="frame"),
-                zmin=0,
-                zmax=255
-                )
-
-fig.update_traces({
-    "showscale": False,
-    "hovertemplate": 'x: %{x}<br>y: %{y}<br>value: %{z}<extra></extra>',
-    },
-    selector = {'type':'heatmap'}
-)
+# the figure shows one frame at a time, fetched from the server as the
+# movie plays, so the page size does not depend on the movie length
 
-fig.data[0].showscale = False
-for f in fig.frames:
-    f.data[0].showscale = False
-
-fig.update_layout({
-    "coloraxis": {'colorscale': cscale_lasco},
-    "xaxis": {
-        "scaleanchor":"y",
-        "showticklabels": False,
-        "visible": False,
-    },
-    "yaxis": {
-        "visible": False
-    },
-    "height": 800,
-    "showlegend": False,
-    "font": {
-        "size":30,
-        "color":"goldenrod",
-        "family": "Arial Black"
-        },
-    "paper_bgcolor": "black",
-    "plot_bgcolor": "black",
-    "transition": {'duration': 1000}
-})
-
-fig.update_layout(transition = {'duration': 0})
-
-# I think this is the frame rate in ms
-fig.layout.updatemenus[0].buttons[0].args[1]['frame']['duration'] = 0
-
-# This is the transition between frames - not sure why it is different
-fig.layout.updatemenus[0].buttons[0].args[1]['transition']['duration'] = 0
-
-# trying to see if this makes it faster in case it is trying to do a linear 
-# interpolation - doesn't seem to matter
-#fig.layout.updatemenus[0].buttons[0].args[1]['transition']['easing'] = None
-
-#fig.layout.updatemenus[0].buttons[0].args[1]['direction'] = 'reverse'
-
-#print(fig.layout.updatemenus[0].buttons[0].args[1]['frame']['duration'])
-
-reverse_button = {
-    'args': [None, {'frame': {'duration': 0, 'redraw': True}, 'mode': 'immediate',
-             'fromcurrent': True, 'direction': 'reverse',
-             'transition': {'duration': 0, 'easing': 'linear'}}],
-    'label': '&#9664;',
-    'method': 'animate'
-}
-fig.layout.updatemenus[0].buttons = (
-    fig.layout.updatemenus[0].buttons[0],
-    reverse_button,
-    fig.layout.updatemenus[0].buttons[1],
-    )
-
-#print(fig)
+encoder = FrameEncoder(scaled_images)
 
 app = Dash()
 
+register_frames(app.server, encoder, '/frames')
+
 app.layout = dbc.Container(
     [
         html.H1("Simple DASH demo"),
@@ -170,10 +86,8 @@ app.layout = dbc.Container(
             className="mb-3",
         ),
         dbc.Card(
-            [dcc.Graph(
-                id = "image-plot",
-                config={"displayModeBar": False},
-            ),
+            [playback_layout("image-plot", len(scaled_images), '/frames',
+                             display_transform("LASCO/C2")),
             ],
             body=True,
             className="mb-3"
@@ -184,18 +98,18 @@ app.layout = dbc.Container(
     className="dash-bootstrap",
 )
 
+register_playback(app, "image-plot", len(scaled_images), '/frames')
+
 @app.callback(
-    Output("image-plot", "figure"),
+    Output("image-plot-transform", "data"),
     [Input("color-chooser", "value")],
 )
 def update_plot(cscale):
-    for f in fig.frames:
-        f.layout.coloraxis.colorscale = scaledict[cscale]
-        f.data[0].showscale = False 
-    fig.update_layout({
-        "coloraxis": {'colorscale': scaledict[cscale]},
-    })
-    return fig
+    # only the display settings go to the browser, the frame urls follow
+    return transform_query(display_transform(cscale))
+
+# per-callback timings at /metrics when PYCAT_METRICS is set
+instrument(app)
 
 if __name__ == "__main__":
     app.run_server(debug=True)
@@ -1,36 +1,19 @@
-from astropy.io import fits
 from datetime import date
 from dash import Dash, dcc, html, Input, Output
 #from skimage import data
 
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
 import dash_bootstrap_components as dbc
-import sunpy.visualization.colormaps as cm
 
-EXPLAINER = """a simple animated figure to work with plotly"""
-
-def matplotlib_to_plotly(cmap, pl_entries):
-    h = 1.0/(pl_entries-1)
-    pl_colorscale = []
-
-    for k in range(pl_entries):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        pl_colorscale.append([k*h, 'rgb'+str((C[0], C[1], C[2]))])
-
-    return pl_colorscale
-
-def matplotlib_to_rgb(cmap, ncolors):
-    h = 1.0/(ncolors-2)
-
-    rgbmap = np.zeros((ncolors,3), dtype=np.uint8)
+from colortables import COLORMAPS, plotly_scale
+from cubecache import scaled_sequence
+from display import DisplayTransform
+from framecache import FrameEncoder
+from metrics import instrument
+from movie import movie_figure
+from playback import playback_layout, register_frames, register_playback
+from tiles import TileEncoder, register_tiled_view, register_tiles, tiled_layout
 
-    for k in range(ncolors):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        rgbmap[k,:] = (C[0], C[1], C[2])
-
-    return rgbmap
+EXPLAINER = """a simple animated figure to work with plotly"""
 
 #------------------------------------------------------------------------------
 # define images
@@ -50,123 +33,71 @@ files = [
     "STEREOA_L3_2012_09_16_143900.fts"
 ]
 
-imagelist = []
-for f in files:
-    fname = dir + '/' + f
-    hdu = fits.open(fname)[0]
-    imagelist.append(hdu.data)
+# number of processes used to decode the files on a cache miss: None
+# reads frames lazily as they are needed, 0 decodes them on every core
+nworkers = None
 
-images = np.array(imagelist)
+# the pyramid levels feed the zoomable full resolution viewer
+arrays, meta = scaled_sequence(dir, files, top=254, levels=4, nworkers=nworkers)
+cube = arrays['cube']
+pyramid = [cube] + [arrays[f'level{n}'] for n in range(1, meta['levels'])]
 
 #------------------------------------------------------------------------------
 # define color scales
-cmap_lasco = plt.get_cmap('soholasco2')
-cmap_stereo = plt.get_cmap('stereocor2')
-
-cscale_lasco = matplotlib_to_plotly(cmap_lasco, 255)
-cscale_stereo = matplotlib_to_plotly(cmap_stereo, 255)
+cscale_lasco = plotly_scale('soholasco2', 255)
+cscale_stereo = plotly_scale('stereocor2', 255)
 
-rgb_lasco = matplotlib_to_rgb(cmap_lasco, 255)
-rgb_stereo = matplotlib_to_rgb(cmap_stereo, 255)
+names = list(COLORMAPS)
 
-names = ["LASCO/C2","STEREO/COR2"]
-
-scaledict = {names[0]: cscale_lasco,
-             names[1]: cscale_stereo}
+scaledict = {name: plotly_scale(cmap, 255) for name, cmap in COLORMAPS.items()}
 
 #for s in cscale_lasco:
 #    print(s)
 
-#--------------------------------------------------
-# convert to rgb
+#------------------------------------------------------------------------------
+# plot figure
 
-rgb = np.zeros((images.shape[0],images.shape[1],images.shape[2],3),
-                dtype=np.uint8)
+# True: the figure shows one frame at a time, fetched from the server as
+# the movie plays, so the page size does not depend on the movie length
+# False: every frame is embedded in the figure
+ondemand = True
 
-h = 1.0/254.0
+# lasco/C2 color scale
+transform = DisplayTransform('soholasco2')
 
-rgbmap = rgb_lasco
+encoder = FrameEncoder(cube)
 
-vmin = np.min(images)
-vmax = np.max(images)
-norm = 254.0/(vmax - vmin)
-for k in np.arange(rgb.shape[0]):
-    cidx = np.uint8(norm*(images[k,:,:] - vmin))
-    for i in np.arange(cidx.shape[0]):
-      for j in np.arange(cidx.shape[1]):
-        rgb[k,i,j,0] = rgbmap[cidx[i,j],0]
-        rgb[k,i,j,1] = rgbmap[cidx[i,j],1]
-        rgb[k,i,j,2] = rgbmap[cidx[i,j],2]
+# zooming in only fetches the 256 x 256 tiles in view, at the pyramid
+# level that matches the size of the graph
+tiler = TileEncoder(pyramid, cache=encoder.cache, name='tiles')
 
-#------------------------------------------------------------------------------
-# plot figure
-fig = px.imshow(rgb, animation_frame=0,
-                binary_string = True,
-                labels={"animation_frame":"frame"},
-                height=800
-                )
-
-fig.update_traces({
-      "showscale": False,
-      "hovertemplate": 'x: %{x}<br>y: %{y}<br>value: %{z}<extra></extra>',
-    },
-    selector = {'type':'heatmap'}
-)
+if not ondemand:
+    fig = movie_figure(encoder.data_uris(transform), height=800)
 
-fig.update_layout({
-    "xaxis": {
-        "scaleanchor":"y",
-        "showticklabels": False,
-        "visible": False,
-    },
-    "yaxis": {
-        "visible": False
-    },
-    "font": {
-        "size":30,
-        "color":"goldenrod",
-        "family": "Arial Black"
-        },
-    "paper_bgcolor": "black",
-# this seems to mess up the animation
-#    "margin": {
-#        't': 10,
-#        'b': 10,
-#        'l': 10,
-#        'r': 10
-#    },
-    "showlegend": False,
-})
-
-fig.update_layout(transition = {'duration': 0})
-fig.layout.updatemenus[0].buttons[0].args[1]['frame']['duration'] = 0
-fig.layout.updatemenus[0].buttons[0].args[1]['transition']['duration'] = 0
-
-#fig.update_traces(colorscale=cscale_lasco)
-
-reverse_button = {
-    'args': [None, {'frame': {'duration': 0, 'redraw': True}, 'mode': 'immediate',
-             'fromcurrent': True, 'direction': 'reverse',
-             'transition': {'duration': 0, 'easing': 'linear'}}],
-    'label': '&#9664;',
-    'method': 'animate'
-}
-
-fig.layout.updatemenus[0].buttons = (
-    fig.layout.updatemenus[0].buttons[0],
-    reverse_button,
-    fig.layout.updatemenus[0].buttons[1],
-    )
+    fig.update_layout({
+        "font": {
+            "size":30,
+            "color":"goldenrod",
+            "family": "Arial Black"
+            },
+    })
 
 app = Dash()
 
+if ondemand:
+    register_frames(app.server, encoder, '/frames')
+
+register_tiles(app.server, tiler, '/tiles')
+
 app.layout = dbc.Container(
     [
         html.H1("Simple DASH demo"),
         dcc.Markdown(EXPLAINER),
         html.Hr(),
         dbc.Card(
-            [dcc.Graph(
+            [playback_layout("image-plot", len(cube), '/frames', transform)
+             if ondemand else
+             dcc.Graph(
                 figure = fig,
                 id = "image-plot",
                 config={"displayModeBar": False},
@@ -174,13 +105,26 @@ app.layout = dbc.Container(
             ],
             body=True,
             className="mb-3"
-        )
+        ),
+        dbc.Card(
+            [html.H4("Full resolution"),
+             tiled_layout("zoom-plot", tiler, '/tiles', transform)],
+            body=True,
+            className="mb-3"
+        ),
     ],
     id="container",
     style={"marginBottom": "300px", "marginTop": "20px"},
     className="dash-bootstrap",
 )
 
+if ondemand:
+    register_playback(app, "image-plot", len(cube), '/frames')
+
+register_tiled_view(app, "zoom-plot", tiler, '/tiles')
+
+# per-callback timings at /metrics when PYCAT_METRICS is set
+instrument(app)
 
 if __name__ == "__main__":
     app.run_server(debug=True)
@@ -5,27 +5,17 @@ It's perhaps the most promising approach so far
 
 import random
 
-from astropy.io import fits
 from dash import Dash, dcc, html
 from dash.dependencies import Input, Output, State
 import json
 import plotly.graph_objects as go
-import plotly.express as px
-import numpy as np
-import matplotlib.pyplot as plt
-import sunpy.visualization.colormaps as cm
 
-#------------------------------------------------------------------------------
-def matplotlib_to_rgb(cmap, ncolors):
-    h = 1.0/(ncolors-2)
-
-    rgbmap = np.zeros((ncolors,3), dtype=np.uint8)
-
-    for k in range(ncolors):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        rgbmap[k,:] = (C[0], C[1], C[2])
-
-    return rgbmap
+from cubecache import scaled_sequence
+from display import DisplayTransform
+from framecache import FrameEncoder
+from metrics import instrument
+from movie import movie_figure
+from playback import playback_layout, register_frames, register_playback, transform_query
 
 #------------------------------------------------------------------------------
 app = Dash(__name__)
@@ -47,31 +37,34 @@ files = [
     "STEREOA_L3_2012_09_16_143900.fts"
 ]
 
-imagelist = []
-for f in files:
-    fname = dir + '/' + f
-    hdu = fits.open(fname)[0]
-    imagelist.append(hdu.data)
-
-images = np.array(imagelist)
-
 #------------------------------------------------------------------------------
 # load scaled data
+# gamma correction is applied to these indices through the color table,
+# so the floating point images are only needed to fill the cache
 
-vmin = np.min(images)
-vmax = np.max(images)
+# background model subtracted before scaling: None, 'median' or 'min',
+# over the whole sequence (window = None) or a running window of frames
+background = None
+window = None
 
-norm = 1.0/(vmax-vmin)
+percentiles = (0, 100) if background is None else (0.5, 99.5)
 
-#------------------------------------------------------------------------------
-# lasco/C2 color scale
+arrays, meta = scaled_sequence(dir, files, top=254, percentiles=percentiles,
+                               filters=dict(background=background, window=window))
+
+basedata = arrays['cube']
+
+# encoded frames are kept in a bounded LRU cache, so moving the gamma
+# slider back to a previous value does not re-encode the movie
+encoder = FrameEncoder(basedata)
 
-cmap_lasco = plt.get_cmap('soholasco2')
-rgb_lasco = matplotlib_to_rgb(cmap_lasco, 255)
+# True: the figure shows one frame at a time, fetched from the server as
+# the movie plays, so the page size does not depend on the movie length
+# False: every frame is embedded in the figure
+ondemand = True
 
-# buffer for storing
-rgb = np.zeros((images.shape[0],images.shape[1],images.shape[2],3),
-                dtype=np.uint8)
+if ondemand:
+    register_frames(app.server, encoder, '/frames')
 
 #------------------------------------------------------------------------------
 
@@ -97,8 +90,10 @@ app.layout = html.Div(style={'backgroundColor': colors['background']}, children=
             'Gamma Correction',
             dcc.Slider(
                 id = "gamma-correction",
-                min = 0.0,
+                # gamma 0 is not a valid display transform
+                min = 0.01,
                 max = 5.0,
+                step = 0.01,
                 value = 1.0
             ),
         ],
@@ -108,99 +103,80 @@ app.layout = html.Div(style={'backgroundColor': colors['background']}, children=
         }
     ),
 
-    dcc.Store(
-        id='figure-store',
-    ),
-
     # this is to display the plot
-    dcc.Graph(
-        id='figure-graph',
-    ),
-    html.Hr(),
-    html.Details([
-        html.Summary('Contents of figure storage'),
-        dcc.Markdown(
-            id='figure-json'
-        )
+    playback_layout('movie', len(basedata), '/frames') if ondemand else
+    html.Div([
+        dcc.Store(
+            id='figure-store',
+        ),
+        dcc.Graph(
+            id='figure-graph',
+        ),
+        html.Hr(),
+        html.Details([
+            html.Summary('Contents of figure storage'),
+            dcc.Markdown(
+                id='figure-json'
+            )
+        ])
     ])])
 
-# recreate figure when gamma changes
-@app.callback(Output('figure-store', 'data'),
-              Input('gamma-correction', 'value'))
-def update_figure_data(gamma):
-    data = (254*(norm*(images - vmin))**gamma).astype(np.uint8)
-    for idx, val in np.ndenumerate(data):
-        rgb[idx[0],idx[1],idx[2],:] = rgb_lasco[val,:]
-
-    fig = px.imshow(rgb, animation_frame=0,
-                binary_string = True,
-                labels={"animation_frame":"frame"},
-                height=800,
-                zmin=0, zmax=255
-                )
-
-    fig.update_layout(transition = {'duration': 0})
-    fig.layout.updatemenus[0].buttons[0].args[1]['frame']['duration'] = 0
-    fig.layout.updatemenus[0].buttons[0].args[1]['transition']['duration'] = 0
-
-    fig.update_layout({
-        "xaxis": {
-            "scaleanchor":"y",
-            "showticklabels": False,
-            "visible": False,
-        },
-        "yaxis": {
-            "visible": False
-        },
-        "showlegend": False,
-        "font": {
-            "size":30,
-            "color":"goldenrod",
-            "family": "Arial Black"
-        },
-        "height": 800,
-        "paper_bgcolor": "black",
-        "plot_bgcolor": "black",
-    })
-
-    reverse_button = {
-        'args': [None, {'frame': {'duration': 0, 'redraw': True}, 'mode': 'immediate',
-                 'fromcurrent': True, 'direction': 'reverse',
-                 'transition': {'duration': 0, 'easing': 'linear'}}],
-        'label': '&#9664;',
-        'method': 'animate'
-    }
-    fig.layout.updatemenus[0].buttons = (
-        fig.layout.updatemenus[0].buttons[0],
-        reverse_button,
-        fig.layout.updatemenus[0].buttons[1],
-        )
-
-    return fig
-
-# regenerate display when the figure store changes
-app.clientside_callback(
-    """
-    function(figure) {
-        if(figure === undefined) {
-            return {'data': [], 'layout': {}};
+if ondemand:
+    register_playback(app, 'movie', len(basedata), '/frames')
+
+    # only the display settings go to the browser, the frame urls follow
+    @app.callback(Output('movie-transform', 'data'),
+                  Input('gamma-correction', 'value'))
+    def update_transform(gamma):
+        return transform_query(DisplayTransform('soholasco2', gamma=gamma))
+
+else:
+    # recreate figure when gamma changes
+    @app.callback(Output('figure-store', 'data'),
+                  Input('gamma-correction', 'value'))
+    def update_figure_data(gamma):
+        # lasco/C2 color scale with gamma folded into the lookup table
+        # frames already encoded with the same transform come from the cache
+        transform = DisplayTransform('soholasco2', gamma=gamma)
+
+        fig = movie_figure(encoder.data_uris(transform), height=800)
+
+        fig.update_layout({
+            "font": {
+                "size":30,
+                "color":"goldenrod",
+                "family": "Arial Black"
+            },
+        })
+
+        return fig
+
+    # regenerate display when the figure store changes
+    app.clientside_callback(
+        """
+        function(figure) {
+            if(figure === undefined) {
+                return {'data': [], 'layout': {}};
+            }
+            const fig = Object.assign({}, figure, {});
+            return fig;
         }
-        const fig = Object.assign({}, figure, {});
-        return fig;
-    }
-    """,
-    Output('figure-graph', 'figure'),
-    Input('figure-store', 'data'),
-)
-
-@app.callback(
-    Output('figure-json', 'children'),
-    Input('figure-store', 'data')
-)
-def generated_px_figure_json(data):
-    return '```\n'+json.dumps(data, indent=2)+'\n```'
-#    return '```\n'+json.dumps(data["layout"], indent=2)+'\n```'
-#    return '```\n'+json.dumps(data["layout"]["template"]["data"], indent=2)+'\n```'
-#    return '```\n'+json.dumps(data["layout"]["template"]["data"]["heatmap"][0], indent=2)+'\n```'
+        """,
+        Output('figure-graph', 'figure'),
+        Input('figure-store', 'data'),
+    )
+
+    @app.callback(
+        Output('figure-json', 'children'),
+        Input('figure-store', 'data')
+    )
+    def generated_px_figure_json(data):
+        return '```\n'+json.dumps(data, indent=2)+'\n```'
+    #    return '```\n'+json.dumps(data["layout"], indent=2)+'\n```'
+    #    return '```\n'+json.dumps(data["layout"]["template"]["data"], indent=2)+'\n```'
+    #    return '```\n'+json.dumps(data["layout"]["template"]["data"]["heatmap"][0], indent=2)+'\n```'
+
+# per-callback timings at /metrics when PYCAT_METRICS is set
+instrument(app)
 
 app.run()
\ No newline at end of file
@@ -4,37 +4,17 @@ This builds off of app3.py but it's an attempt to store the plot data in a buffe
 
 import random
 
-from astropy.io import fits
 from dash import Dash, dcc, html
 from dash.dependencies import Input, Output, State
 import json
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
-import matplotlib.pyplot as plt
-import sunpy.visualization.colormaps as cm
 
-#------------------------------------------------------------------------------
-def matplotlib_to_rgb(cmap, ncolors):
-    h = 1.0/(ncolors-2)
-
-    rgbmap = np.zeros((ncolors,3), dtype=np.uint8)
-
-    for k in range(ncolors):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        rgbmap[k,:] = (C[0], C[1], C[2])
-
-    return rgbmap
-
-def matplotlib_to_plotly(cmap, ncolors):
-    h = 1.0/(ncolors-1)
-    pl_colorscale = []
-
-    for k in range(ncolors):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        pl_colorscale.append([k*h, 'rgb'+str((C[0], C[1], C[2]))])
-
-    return pl_colorscale
+from colorize import colorize
+from colortables import plotly_scale, rgb_table
+from cubecache import scaled_sequence
+from metrics import instrument
 
 #------------------------------------------------------------------------------
 app = Dash(__name__)
@@ -56,21 +36,13 @@ files = [
     "STEREOA_L3_2012_09_16_143900.fts"
 ]
 
-imagelist = []
-for f in files:
-    fname = dir + '/' + f
-    hdu = fits.open(fname)[0]
-    imagelist.append(hdu.data)
-
-images = np.array(imagelist)
-
 #------------------------------------------------------------------------------
-# load scaled data
+# load scaled data, cached on disk between runs
 
-vmin = np.min(images)
-vmax = np.max(images)
+arrays, meta = scaled_sequence(dir, files, top=254)
 
-norm = 1.0/(vmax-vmin)
+basedata = arrays['cube']
+vmin, vmax = meta['vmin'], meta['vmax']
 
 # used to reset the color scale
 baseidx = np.arange(256)
@@ -78,9 +50,8 @@ baseidx = np.arange(256)
 #------------------------------------------------------------------------------
 # lasco/C2 color scale
 
-cmap_lasco = plt.get_cmap('soholasco2')
-rgb_lasco = matplotlib_to_rgb(cmap_lasco, 255)
-cscale_lasco = matplotlib_to_plotly(cmap_lasco,255)
+rgb_lasco = rgb_table('soholasco2', 255)
+cscale_lasco = plotly_scale('soholasco2', 255)
 
 #------------------------------------------------------------------------------
 # generate original figure
@@ -91,12 +62,10 @@ cscale_lasco = matplotlib_to_plotly(cmap_lasco,255)
 # which greatly speeds up the rendering
 
 # buffer for storing
-rgb = np.zeros((images.shape[0],images.shape[1],images.shape[2],3),
+rgb = np.zeros(basedata.shape + (3,),
                 dtype=np.uint8)
 
-basedata = (254*norm*(images - vmin)).astype(np.uint8)
-for idx, val in np.ndenumerate(basedata):
-    rgb[idx[0],idx[1],idx[2],:] = rgb_lasco[val,:]
+colorize(basedata, rgb_lasco, out=rgb)
 
 fig = px.imshow(rgb, animation_frame=0,
             binary_string = True,
@@ -238,4 +207,7 @@ def generated_px_figure_json(figure):
 #    return '```\n'+json.dumps(data["layout"]["template"]["data"], indent=2)+'\n```'
 #    return '```\n'+json.dumps(data["layout"]["template"]["data"]["heatmap"][0], indent=2)+'\n```'
 
+# per-callback timings at /metrics when PYCAT_METRICS is set
+instrument(app)
+
 app.run()
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+Persistent on-disk cache of numpy arrays.
+
+Results that are the same work on every restart of an app (scaled cubes
+and their pyramids, lookup grids) are stored as .npy files that are
+memory-mapped straight back in on the next run.  Entries are keyed on
+the identity of the source files (path, size, modification time) and
+on the processing parameters, so touching a file or changing a parameter
+simply misses the cache.  The cache is bounded in size: the least
+recently used entries are evicted once it grows past maxbytes.
+
+This module only depends on numpy, so that anything can cache arrays.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+# bump this whenever the layout or meaning of cached arrays changes
+CACHE_VERSION = 3
+
+CACHE_DIR = os.environ.get('PYCAT_CACHE_DIR',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'pycat'))
+
+# default size bound, 4 GB
+CACHE_BYTES = 4 * 1024**3
+
+# staging directories this old are left over from a crash, even if a
+# process with their pid exists
+STAGING_SECONDS = 24 * 3600
+
+#------------------------------------------------------------------------------
+def source_key(paths, **params):
+    """Hash the identity of the source files together with params"""
+    sources = []
+    for p in paths:
+        st = os.stat(p)
+        sources.append([os.path.abspath(p), st.st_size, st.st_mtime_ns])
+
+    blob = json.dumps({'version': CACHE_VERSION,
+                       'sources': sources,
+                       'params': params}, sort_keys=True, default=str)
+
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+def _alive(pid):
+    # whether process pid may still be writing; without a side effect
+    # free check (on Windows os.kill terminates) assume it is
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # it exists, but belongs to someone else
+        pass
+    return True
+
+#------------------------------------------------------------------------------
+class CubeCache:
+    """
+    A directory of cache entries.  Each entry is a subdirectory named
+    after its key that holds one .npy file per array plus meta.json.
+    """
+
+    def __init__(self, cachedir=None, maxbytes=CACHE_BYTES):
+        self.cachedir = cachedir or CACHE_DIR
+        self.maxbytes = maxbytes
+        os.makedirs(self.cachedir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cachedir, key)
+
+    def get(self, key):
+        """
+        Return (arrays, meta) for key, with arrays a dict of read-only
+        memory-mapped arrays, or None if key is not in the cache.
+        """
+        path = self._path(key)
+        metafile = os.path.join(path, 'meta.json')
+        try:
+            with open(metafile) as f:
+                meta = json.load(f)
+            arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+                      for name in meta['arrays']}
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # the mtime of meta.json records when the entry was last used
+        # (not on a read-only cache, which then simply is not evicted)
+        try:
+            os.utime(metafile)
+        except OSError:
+            pass
+
+        return arrays, meta['meta']
+
+    def staging(self, key):
+        """
+        Return a new directory to write the .npy files of an entry for
+        key into, e.g. with np.lib.format.open_memmap(), see commit()
+        """
+        path = f"{self._path(key)}.tmp{os.getpid()}"
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def commit(self, key, staging, names, meta=None):
+        """
+        Turn a staging directory holding name.npy for every name in names
+        into the entry for key, with json-able meta
+        """
+        try:
+            with open(os.path.join(staging, 'meta.json'), 'w') as f:
+                json.dump({'arrays': list(names), 'meta': meta or {}}, f)
+            # entries only ever appear complete
+            os.rename(staging, self._path(key))
+        except OSError:
+            # most likely another process stored the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+
+        self.evict(keep=key)
+
+    def put(self, key, arrays, meta=None):
+        """Store a dict of arrays (and json-able meta) under key"""
+        staging = self.staging(key)
+        try:
+            for name, a in arrays.items():
+                np.save(os.path.join(staging, name + '.npy'), a)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        self.commit(key, staging, list(arrays), meta)
+
+    def entries(self):
+        """Return a list of (last used, size in bytes, key), oldest first"""
+        entries = []
+        for key in os.listdir(self.cachedir):
+            path = self._path(key)
+            try:
+                used = os.path.getmtime(os.path.join(path, 'meta.json'))
+                size = sum(e.stat().st_size for e in os.scandir(path))
+            except OSError:
+                continue
+            entries.append((used, size, key))
+        return sorted(entries)
+
+    def sweep(self):
+        """
+        Remove the staging directories of writers that died (crashed
+        before commit()), which are not entries and would otherwise
+        stay around uncounted
+        """
+        now = time.time()
+        for name in os.listdir(self.cachedir):
+            key, tmp, pid = name.rpartition('.tmp')
+            if not (key and pid.isdigit()):
+                continue
+            path = self._path(name)
+            try:
+                age = now - os.path.getmtime(path)
+            except OSError:
+                continue
+            if not _alive(int(pid)) or age > STAGING_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def evict(self, keep=None):
+        """
+        Remove stale staging directories, then least recently used
+        entries until the cache fits maxbytes
+        """
+        self.sweep()
+        entries = self.entries()
+        total = sum(e[1] for e in entries)
+        for used, size, key in entries:
+            if total <= self.maxbytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        self.sweep()
+        for used, size, key in self.entries():
+            shutil.rmtree(self._path(key), ignore_errors=True)
@@ -0,0 +1,111 @@
+"""
+Background models for coronagraph sequences.
+
+The background is the median (or minimum) of every pixel over time,
+either over the whole sequence or over a window of frames centred on
+each frame.  np.nanmedian(images, axis=0) needs the stacked sequence in
+memory; here the cube is read in bands of rows instead, (time, rows, x)
+at a time, so memory is bounded by the band size no matter how long the
+sequence is.  Bands are independent and can be done by a thread pool.
+
+A lazy cube (e.g. a FitsCube or a DifferenceCube) would decode every
+frame again for every band, so split into several bands it is first
+written, one frame at a time, to a scratch np.memmap.  Windowed
+backgrounds are as large as the sequence itself, so they go to a
+scratch np.memmap as well unless an output array is given.  Subtract the
+background with DifferenceCube(cube, 'background', background=bg).
+"""
+
+import os
+import warnings
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from numpy.lib.stride_tricks import sliding_window_view
+
+from fitsload import scratch_cube
+
+METHODS = {'median': np.nanmedian, 'min': np.nanmin}
+
+# default bound on the temporaries of one band, 64 MB
+BAND_BYTES = 64 * 1024**2
+
+#------------------------------------------------------------------------------
+def _band_rows(shape, window, itemsize, maxbytes):
+    # rows per band so that a band and its window copies fit in maxbytes
+    nt, ny, nx = shape
+    per_row = nt * nx * itemsize * (1 + (window or 1))
+    return int(np.clip(maxbytes // per_row, 1, ny))
+
+def _run(work, items, nworkers):
+    # work(item) for all items, by nworkers threads if given
+    if nworkers is None or nworkers == 1:
+        for item in items:
+            work(item)
+    else:
+        with ThreadPoolExecutor(max_workers=nworkers or os.cpu_count()) as pool:
+            list(pool.map(work, items))
+
+def _reduce_band(cube, out, func, window, r0, r1):
+    band = np.asarray(cube[:, r0:r1], dtype=out.dtype)
+
+    with warnings.catch_warnings():
+        # pixels that are NaN throughout stay NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if window is None:
+            out[r0:r1] = func(band, axis=0)
+        else:
+            # NaN padding truncates the window at the ends of the sequence
+            half = window // 2
+            pad = np.full((half,) + band.shape[1:], np.nan, dtype=band.dtype)
+            padded = np.concatenate([pad, band, pad[:window - 1 - half]])
+            windows = sliding_window_view(padded, window, axis=0)
+            out[:, r0:r1] = func(windows, axis=-1)
+
+def background(cube, method='median', window=None, nworkers=None, out=None,
+               scratch_dir=None, maxbytes=BAND_BYTES):
+    """
+    Return the background of a (time, y, x) cube: the per-pixel median
+    (or min) over all frames as a (y, x) image or, if window is given,
+    over the window frames centred on every frame as a (time, y, x) cube.
+
+    The cube is processed in bands of rows sized so that the temporaries
+    of a band stay below maxbytes, by nworkers threads if given (0 means
+    one per core).  A windowed background is written into out or else a
+    scratch np.memmap in scratch_dir, see fitsload.scratch_cube(), which
+    also holds the frames of a lazy cube (anything but a numpy array)
+    that needs more than one band.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown background method {method!r}, use one of {list(METHODS)}")
+    func = METHODS[method]
+
+    shape = tuple(cube.shape)
+    dtype = np.result_type(np.dtype(cube.dtype).newbyteorder('='), np.float32)
+
+    if out is None:
+        if window is None:
+            out = np.empty(shape[1:], dtype=dtype)
+        else:
+            out = scratch_cube(shape, dtype, scratch_dir)
+
+    rows = _band_rows(shape, window, np.dtype(dtype).itemsize, maxbytes)
+    bands = [(r0, min(r0 + rows, shape[1])) for r0 in range(0, shape[1], rows)]
+
+    if len(bands) > 1 and not isinstance(cube, np.ndarray):
+        # read (or compute) every frame once, not once per band
+        frames = scratch_cube(shape, dtype, scratch_dir)
+
+        def read(k):
+            frames[k] = cube[k]
+
+        _run(read, range(shape[0]), nworkers)
+        cube = frames
+
+    def work(band):
+        _reduce_band(cube, out, func, window, *band)
+
+    _run(work, bands, nworkers)
+    return out
@@ -0,0 +1,83 @@
+"""
+Timing and memory measurement shared by the benchmark scripts.
+"""
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # not on Windows
+    resource = None
+
+# the pipeline modules live in the top level of the repo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+#------------------------------------------------------------------------------
+def measure(func, *args, repeat=1, trace=True, **kwargs):
+    """
+    Call func(*args, **kwargs) repeat times and return (result, best
+    wall time in s, peak traced memory in bytes).  Memory is traced with
+    tracemalloc, which sees numpy allocations but not memory maps; it
+    slows down python heavy code, so trace=False skips it (peak is 0).
+    """
+    best = float('inf')
+    peak = 0
+    for n in range(repeat):
+        gc.collect()
+        if trace:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - t0
+        if trace:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        best = min(best, seconds)
+    return result, best, peak
+
+def reset_peak_rss():
+    """
+    Reset the peak resident set size of this process, where the system
+    allows it (Linux), so that peak_rss() covers what follows
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def peak_rss():
+    """
+    Peak resident set size in bytes of this process or of the largest
+    of its finished child processes (e.g. workers), whichever is larger.
+    Unlike tracemalloc this includes memory maps.  0 where unsupported.
+    """
+    if resource is None:
+        return 0
+    # ru_maxrss is in kB on Linux, in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return scale * max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                       resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+def report(rows, columns, as_json=False):
+    """Print a list of dict rows as a fixed width table (or json lines)"""
+    if as_json:
+        for row in rows:
+            print(json.dumps(row))
+        return
+
+    def fmt(v):
+        if isinstance(v, float):
+            return f"{v:.4g}"
+        return str(v)
+
+    widths = [max(len(c), *(len(fmt(r.get(c, ''))) for r in rows)) for c in columns]
+    print('  '.join(c.rjust(w) for c, w in zip(columns, widths)))
+    for r in rows:
+        print('  '.join(fmt(r.get(c, '')).rjust(w) for c, w in zip(columns, widths)))
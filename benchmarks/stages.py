@@ -0,0 +1,161 @@
+"""
+Time every stage of the image pipeline on a synthetic sequence.
+
+The stages run in the order the apps run them, each on the output of
+the one before: FITS load, statistics (histograms and clip levels),
+scaling to uint8, downsampling (pyramid), colorization, PNG/base64
+encoding and figure JSON serialization.  For every stage the wall time,
+throughput, peak traced memory and peak resident set size (which also
+counts memory maps and worker processes) are reported.  Every stage
+streams through the sequence a frame at a time, so sequences much
+larger than memory can be measured; only the figure JSON is built from
+the first few frames, as a whole movie of them would not fit.
+
+    python benchmarks/stages.py --size 1024 --frames 10
+    python benchmarks/stages.py --size 2048 --frames 100 --workers 0 --json
+
+Without --dir the sequence is generated into a temporary directory.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from harness import measure, peak_rss, report, reset_peak_rss
+from synthetic import write_sequence
+
+from display import DisplayTransform, apply_display
+from fitsload import FitsCube, load_sequence, read_sequence, scratch_cube
+from framecache import FrameCache, FrameEncoder
+from movie import movie_figure
+from pyramid import build_pyramid
+from scaling import scale_to_uint8
+from stats import sequence_histogram
+
+COLUMNS = ['stage', 'seconds', 'frames/s', 'MB/s', 'peak MB', 'peak RSS MB', 'out MB']
+
+# frames embedded in the figure for the figure json stage
+JSON_FRAMES = 10
+
+#------------------------------------------------------------------------------
+# every stage streams through the sequence one frame at a time, as the
+# pipeline does, and only keeps what the next stage needs: the lazy or
+# memory-mapped cubes.  Stages that discard their output return the
+# number of bytes they produced instead.
+
+def _load(dir, files, nworkers):
+    if nworkers is None:
+        cube = load_sequence(dir, files)
+        # touch (decode) every frame once
+        buf = np.empty(cube.shape[1:], dtype=cube.dtype)
+        for k in range(len(cube)):
+            cube.frame(k, out=buf)
+        return cube
+    return read_sequence([os.path.join(dir, f) for f in files], nworkers=nworkers)
+
+def _levels(images, nworkers):
+    hist = sequence_histogram(images, nworkers=nworkers)
+    return hist.clip_levels(0.5, 99.5)
+
+def _scale(images, vmin, vmax):
+    return scale_to_uint8(images, vmin, vmax, out=scratch_cube(images.shape, np.uint8))
+
+def _pyramid(images):
+    return sum(level.nbytes for frame in images for level in build_pyramid(frame, 4)[1:])
+
+def _colorize(cube, transform):
+    buf = np.empty(cube.shape[1:] + (3,), dtype=np.uint8)
+    for frame in cube:
+        apply_display(frame, transform, out=buf)
+    return buf.nbytes * len(cube)
+
+def _encode(cube, transform):
+    # a fresh encoder that caches nothing, so every frame is encoded;
+    # only the first JSON_FRAMES uris are kept, for the figure
+    encoder = FrameEncoder(cube, cache=FrameCache(maxbytes=0))
+    uris = []
+    nbytes = 0
+    for k in range(len(cube)):
+        uri = encoder.data_uri(k, transform)
+        nbytes += len(uri)
+        if k < JSON_FRAMES:
+            uris.append(uri)
+    return uris, nbytes
+
+def _figure_json(uris):
+    return movie_figure(uris).to_json()
+
+def _nbytes(result):
+    if isinstance(result, (int, np.integer)):
+        return int(result)
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, str):
+        return len(result)
+    if isinstance(result, (list, tuple)):
+        return sum(_nbytes(r) for r in result if not isinstance(r, float))
+    return 0
+
+def run_stages(dir, files, nworkers=None, repeat=1):
+    """Run the pipeline stages on dir/files and return one row per stage"""
+    transform = DisplayTransform()
+    rows = []
+
+    def stage(name, func, *args, nbytes_in, nframes=len(files)):
+        reset_peak_rss()
+        result, seconds, peak = measure(func, *args, repeat=repeat)
+        rows.append({'stage': name,
+                     'seconds': seconds,
+                     'frames/s': nframes/seconds,
+                     'MB/s': nbytes_in/seconds/1e6,
+                     'peak MB': peak/1e6,
+                     'peak RSS MB': peak_rss()/1e6,
+                     'out MB': _nbytes(result)/1e6})
+        return result
+
+    nfits = sum(os.path.getsize(os.path.join(dir, f)) for f in files)
+
+    images = stage('load', _load, dir, files, nworkers, nbytes_in=nfits)
+    vmin, vmax = stage('statistics', _levels, images, nworkers, nbytes_in=images.nbytes)
+    cube = stage('scaling', _scale, images, vmin, vmax, nbytes_in=images.nbytes)
+    stage('downsampling', _pyramid, images, nbytes_in=images.nbytes)
+    stage('colorization', _colorize, cube, transform, nbytes_in=cube.nbytes)
+    uris, nbytes = stage('encoding', _encode, cube, transform, nbytes_in=3*cube.nbytes)
+    stage('figure json', _figure_json, uris, nbytes_in=_nbytes(uris), nframes=len(uris))
+
+    return rows
+
+#------------------------------------------------------------------------------
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, help="frame size in pixels (default 1024)")
+    parser.add_argument('--frames', type=int, help="number of frames (default 10)")
+    parser.add_argument('--dir', help="use (or create) the sequence in this directory")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="processes/threads for load and statistics (0: all cores)")
+    parser.add_argument('--repeat', type=int, default=1, help="report the best of n runs")
+    parser.add_argument('--json', action='store_true', help="print json lines")
+    args = parser.parse_args()
+
+    dir = args.dir or tempfile.mkdtemp(prefix='pycat-bench-')
+    try:
+        os.makedirs(dir, exist_ok=True)
+        files = sorted(f for f in os.listdir(dir) if f.endswith('.fts'))
+        if len(files) == 0:
+            files = write_sequence(dir, args.frames or 10, args.size or 1024)
+        else:
+            # an existing sequence is used as it is
+            shape = FitsCube([os.path.join(dir, files[0])]).shape[1:]
+            if args.frames not in (None, len(files)) or args.size not in (None, *shape):
+                parser.error(f"{dir} already holds {len(files)} frames of {shape}, "
+                             "which does not match --frames/--size")
+
+        if not args.json:
+            print(f"{len(files)} frames from {dir}")
+        report(run_stages(dir, files, args.workers, args.repeat), COLUMNS, args.json)
+    finally:
+        if args.dir is None:
+            shutil.rmtree(dir, ignore_errors=True)
@@ -0,0 +1,165 @@
+"""
+Compare the rendering strategies explored by the apps, headless.
+
+Every strategy gets the same synthetic uint8 sequence and goes through
+the same interactions (gamma changes, one of them repeated).  For each
+one the server side compute time, the JSON encode time (with the same
+encoder Dash uses) and the size of the payload sent to the browser are
+reported, averaged over the interactions:
+
+  heatmap-coloraxis    app1.py: uint8 heatmap frames, the whole figure
+                       is returned with a new coloraxis
+  rgb-binary-string    app2.py/writepng.py: colorize, then px.imshow
+                       with binary_string=True
+  buffered-rgb         app4.py: as above, colorized into a reused buffer
+  regenerate-on-gamma  app3.py: movie_figure() from a caching FrameEncoder
+  clientside-buffer    examples/clientside2.py: the frames go to a
+                       dcc.Store and are swapped into the figure clientside
+  frames-on-demand     playback.py: only the transform goes out in the
+                       json, then the browser downloads the png of the
+                       shown frame, which counts towards the payload
+
+    python benchmarks/strategies.py --size 512 --frames 10 50 100
+"""
+
+import argparse
+
+from collections import namedtuple
+
+import numpy as np
+import plotly.express as px
+
+from plotly.io.json import to_json_plotly
+
+from harness import measure, report
+from synthetic import synthetic_frame
+
+from colortables import plotly_scale
+from display import DisplayTransform, apply_display
+from framecache import FrameEncoder
+from movie import movie_figure
+from playback import transform_query
+from scaling import data_range, scale_to_uint8
+
+COLUMNS = ['strategy', 'frames', 'setup s', 'compute s', 'json s', 'payload MB']
+
+# gamma values of the interactions, the last one repeats the first
+GAMMAS = (0.8, 1.2, 1.6, 0.8)
+
+# a callback output plus the bytes the browser then fetches outside it
+Download = namedtuple('Download', 'output data')
+
+#------------------------------------------------------------------------------
+def synthetic_cube(nframes, size):
+    """A uint8 (nframes, size, size) cube scaled like the apps scale theirs"""
+    images = np.array([synthetic_frame(k, nframes, size) for k in range(nframes)])
+    vmin, vmax = data_range(images, 0.5, 99.5)
+    return scale_to_uint8(images, vmin, vmax, top=254)
+
+def _gamma_scale(gamma):
+    # the colorscale with gamma folded in, as imp1/imp2 build it
+    base = plotly_scale('soholasco2', 256)
+    idx = (255*np.power(np.arange(256)/255, 1/gamma)).astype(np.uint8)
+    return [[c[0], base[i][1]] for c, i in zip(base, idx)]
+
+#------------------------------------------------------------------------------
+# one setup(cube) and interact(state, gamma) per strategy; interact returns
+# what the callback would hand to Dash for serialization
+
+def setup_heatmap(cube):
+    fig = px.imshow(cube, animation_frame=0, zmin=0, zmax=255)
+    return fig.to_dict()
+
+def interact_heatmap(figdict, gamma):
+    layout = dict(figdict['layout'],
+                  coloraxis=dict(figdict['layout'].get('coloraxis', {}),
+                                 colorscale=_gamma_scale(gamma)))
+    return dict(figdict, layout=layout)
+
+def setup_rgb(cube):
+    return cube
+
+def interact_rgb(cube, gamma):
+    rgb = apply_display(cube, DisplayTransform(gamma=gamma))
+    return px.imshow(rgb, animation_frame=0, binary_string=True)
+
+def setup_buffered(cube):
+    return cube, np.empty(cube.shape + (3,), dtype=np.uint8)
+
+def interact_buffered(state, gamma):
+    cube, rgb = state
+    apply_display(cube, DisplayTransform(gamma=gamma), out=rgb)
+    return px.imshow(rgb, animation_frame=0, binary_string=True)
+
+def setup_regenerate(cube):
+    return FrameEncoder(cube)
+
+def interact_regenerate(encoder, gamma):
+    return movie_figure(encoder.data_uris(DisplayTransform(gamma=gamma)))
+
+def setup_clientside(cube):
+    return cube, px.imshow(cube[0], zmin=0, zmax=255).to_dict()
+
+def interact_clientside(state, gamma):
+    # the buffer store and the figure with the new colorscale
+    cube, figdict = state
+    layout = dict(figdict['layout'],
+                  coloraxis=dict(figdict['layout'].get('coloraxis', {}),
+                                 colorscale=_gamma_scale(gamma)))
+    return [cube, dict(figdict, layout=layout)]
+
+def setup_ondemand(cube):
+    return FrameEncoder(cube)
+
+def interact_ondemand(encoder, gamma):
+    # the store update, plus the png of the frame that is on screen
+    t = DisplayTransform(gamma=gamma)
+    return Download(transform_query(t), encoder.encode(0, t))
+
+STRATEGIES = {
+    'heatmap-coloraxis': (setup_heatmap, interact_heatmap),
+    'rgb-binary-string': (setup_rgb, interact_rgb),
+    'buffered-rgb': (setup_buffered, interact_buffered),
+    'regenerate-on-gamma': (setup_regenerate, interact_regenerate),
+    'clientside-buffer': (setup_clientside, interact_clientside),
+    'frames-on-demand': (setup_ondemand, interact_ondemand),
+}
+
+#------------------------------------------------------------------------------
+def run_strategy(name, cube, gammas=GAMMAS):
+    """Return the report row of one strategy on a cube"""
+    setup, interact = STRATEGIES[name]
+    state, setup_s, _ = measure(setup, cube, trace=False)
+
+    compute = encode = nbytes = 0.0
+    for gamma in gammas:
+        output, seconds, _ = measure(interact, state, gamma, trace=False)
+        data = b''
+        if isinstance(output, Download):
+            output, data = output
+        payload, json_s, _ = measure(to_json_plotly, output, trace=False)
+        compute += seconds
+        encode += json_s
+        nbytes += len(payload) + len(data)
+
+    n = len(gammas)
+    return {'strategy': name, 'frames': len(cube), 'setup s': setup_s,
+            'compute s': compute/n, 'json s': encode/n, 'payload MB': nbytes/n/1e6}
+
+#------------------------------------------------------------------------------
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=512, help="frame size in pixels")
+    parser.add_argument('--frames', type=int, nargs='+', default=[10],
+                        help="sequence lengths to compare")
+    parser.add_argument('--strategies', nargs='+', default=list(STRATEGIES),
+                        choices=list(STRATEGIES))
+    parser.add_argument('--json', action='store_true', help="print json lines")
+    args = parser.parse_args()
+
+    rows = []
+    for nframes in args.frames:
+        cube = synthetic_cube(nframes, args.size)
+        rows.extend(run_strategy(name, cube) for name in args.strategies)
+
+    report(rows, COLUMNS, args.json)
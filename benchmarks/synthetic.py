@@ -0,0 +1,91 @@
+"""
+Synthetic coronagraph-like FITS sequences for the benchmarks.
+
+Every frame is a STEREO/COR2-like L3 image: an occulted disk (NaN), a
+K-corona falling off as r**-3, a few streamers modulated in position
+angle, a CME loop that expands outward over the sequence, noise, a
+handful of hot pixels and a NaN border outside the field of view.  The
+files are named like the STEREO L3 products the apps load, so a
+generated directory can stand in for ./data.
+
+    python benchmarks/synthetic.py --size 1024 --frames 10 data
+"""
+
+import argparse
+import datetime
+import os
+
+import numpy as np
+
+from astropy.io import fits
+
+#------------------------------------------------------------------------------
+def synthetic_frame(k, nframes, size=1024, seed=0):
+    """Return frame k of an nframes long sequence as a float32 (size, size) image"""
+    rng = np.random.default_rng((seed, k))
+
+    # coordinates in units of the field of view radius
+    y, x = np.ogrid[-1:1:size*1j, -1:1:size*1j]
+    r = np.hypot(x, y)
+    pa = np.arctan2(x, y)
+
+    rocc = 0.15
+    rs = np.maximum(r, rocc)
+
+    # K-corona and streamers
+    image = 1e-9 * (rocc/rs)**3
+    image *= 1 + 0.6*np.cos(2*pa)**8 + 0.3*np.cos(3*pa + 0.5)**16
+
+    # a CME loop at position angle 60 deg, moving out from 0.2 to 0.9
+    front = 0.2 + 0.7*(k + 1)/max(nframes, 1)
+    width = 0.05 + 0.1*front
+    dpa = np.angle(np.exp(1j*(pa - np.radians(60))))
+    loop = np.exp(-((r - front)/width)**2) * np.exp(-(dpa/(0.25 + 0.2*front))**2)
+    image += 3e-9 * (rocc/rs)**2 * loop
+
+    image *= rng.normal(1.0, 0.02, image.shape)
+    image = image.astype(np.float32)
+
+    # hot pixels, occulter and the corners outside the field of view
+    hot = rng.integers(0, size, (2, 20))
+    image[hot[0], hot[1]] = 1e-6
+    image[(r < rocc) | (r > 1)] = np.nan
+
+    return image
+
+def write_sequence(dir, nframes=10, size=1024, seed=0, start=None, cadence=15):
+    """
+    Write nframes synthetic FITS files into dir and return their names,
+    in time order.  start is the datetime of the first frame and cadence
+    the time between frames in minutes.
+    """
+    os.makedirs(dir, exist_ok=True)
+    if start is None:
+        start = datetime.datetime(2012, 9, 16, 11, 39)
+
+    files = []
+    for k in range(nframes):
+        t = start + datetime.timedelta(minutes=cadence*k)
+        name = t.strftime("STEREOA_L3_%Y_%m_%d_%H%M%S.fts")
+        hdr = fits.Header()
+        hdr['DATE-OBS'] = t.isoformat()
+        hdr['INSTRUME'] = 'SYNTHETIC'
+        hdr['CRPIX1'] = (size + 1)/2
+        hdr['CRPIX2'] = (size + 1)/2
+        data = synthetic_frame(k, nframes, size, seed)
+        fits.writeto(os.path.join(dir, name), data, hdr, overwrite=True)
+        files.append(name)
+
+    return files
+
+#------------------------------------------------------------------------------
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('dir', help="output directory")
+    parser.add_argument('--size', type=int, default=1024, help="frame size in pixels")
+    parser.add_argument('--frames', type=int, default=10, help="number of frames")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    files = write_sequence(args.dir, args.frames, args.size, args.seed)
+    print(f"wrote {len(files)} {args.size}x{args.size} frames to {args.dir}")
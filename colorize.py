@@ -0,0 +1,44 @@
+"""
+Colorize uint8 index images through an RGB lookup table.
+
+This replaces the per-pixel python loops (np.ndenumerate or nested
+for loops) with one fancy-indexing gather per chunk of frames, written
+into a preallocated output buffer that can be reused between calls.
+"""
+
+import numpy as np
+
+#------------------------------------------------------------------------------
+def full_lut(lut):
+    """
+    Pad an (ncolors, 3) lookup table to 256 entries by repeating the
+    last color, so that every uint8 index is valid
+    """
+    lut = np.ascontiguousarray(lut, dtype=np.uint8)
+    if len(lut) < 256:
+        pad = np.repeat(lut[-1:], 256 - len(lut), axis=0)
+        lut = np.concatenate([lut, pad])
+    return lut
+
+def colorize(indices, lut, out=None, nframes=1):
+    """
+    Return lut[indices] as an (..., 3) uint8 array.
+
+    indices is a uint8 (or uint16) image (y, x) or cube (time, y, x)
+    and lut an (ncolors, 3) uint8 table.  If out is given it is filled
+    in place; it must have shape indices.shape + (3,).  Cubes are
+    processed nframes at a time, which bounds the size of temporaries.
+    """
+    lut = full_lut(lut)
+
+    if out is None:
+        out = np.empty(indices.shape + (3,), dtype=np.uint8)
+
+    if indices.ndim < 3:
+        np.take(lut, indices, axis=0, out=out, mode='clip')
+        return out
+
+    for k in range(0, indices.shape[0], nframes):
+        np.take(lut, indices[k:k+nframes], axis=0, out=out[k:k+nframes], mode='clip')
+
+    return out
@@ -0,0 +1,69 @@
+"""
+Registry of color tables derived from matplotlib colormaps.
+
+Each (colormap name, ncolors) table is built once per process with a
+single vectorized call to the colormap and then memoized, both as a
+uint8 RGB lookup table (for colorize) and as a plotly colorscale.  The
+sunpy coronagraph colormaps used by the apps are built at import time,
+so switching between them costs a dictionary lookup.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import matplotlib.pyplot as plt
+import sunpy.visualization.colormaps  # noqa: F401 (registers the sunpy colormaps)
+
+# display names used in the apps
+COLORMAPS = {
+    "LASCO/C2": 'soholasco2',
+    "STEREO/COR2": 'stereocor2',
+}
+
+#------------------------------------------------------------------------------
+def _sample(cmap, x):
+    # cmap evaluated on an array of positions, truncated to uint8
+    return (cmap(x)[:, :3]*255).astype(np.uint8)
+
+def matplotlib_to_rgb(cmap, ncolors):
+    """
+    Return an (ncolors, 3) uint8 lookup table for colorize.
+
+    The table is sampled with a spacing of 1/(ncolors-2), so that
+    index ncolors-2 (254 for the usual 255 colors) is the top of the
+    colormap.
+    """
+    h = 1.0/(ncolors-2)
+    return _sample(cmap, np.arange(ncolors)*h)
+
+def matplotlib_to_plotly(cmap, ncolors):
+    """Return a plotly colorscale with ncolors entries"""
+    h = 1.0/(ncolors-1)
+    C = _sample(cmap, np.arange(ncolors)*h)
+    return [[k*h, f"rgb({r}, {g}, {b})"] for k, (r, g, b) in enumerate(C.tolist())]
+
+def plotly_to_rgb(cscale):
+    """Inverse of matplotlib_to_plotly: (ncolors, 3) uint8 lookup table"""
+    return np.array([s[s.find('(')+1:s.find(')')].split(',') for _, s in cscale],
+                    dtype=float).astype(np.uint8)
+
+#------------------------------------------------------------------------------
+@lru_cache(maxsize=64)
+def rgb_table(name, ncolors=255):
+    """Memoized matplotlib_to_rgb for a named colormap (read-only)"""
+    rgbmap = matplotlib_to_rgb(plt.get_cmap(name), ncolors)
+    rgbmap.flags.writeable = False
+    return rgbmap
+
+@lru_cache(maxsize=None)
+def plotly_scale(name, ncolors=255):
+    """
+    Memoized matplotlib_to_plotly for a named colormap.  The list is
+    shared, so copy it before modifying it.
+    """
+    return matplotlib_to_plotly(plt.get_cmap(name), ncolors)
+
+for _name in COLORMAPS.values():
+    for _n in (255, 256):
+        rgb_table(_name, _n)
+        plotly_scale(_name, _n)
@@ -1,34 +1,16 @@
 # platform to play with plotting the cone model
 
-import numpy as np
 import matplotlib.pyplot as plt
 
+from conegeom import quartic
 
-#-----------------------------------
-def cone(a, rs):
-
-    zmax = a * np.sqrt(2.0)
-    z = np.linspace(0.0,zmax,num=N)
-
-    alpha = z*z
-    gamma = a*a
-
-    b = 2.0*(alpha + gamma)
-    c = alpha*(alpha - 2.0 * gamma)
-
-    beta = (- b + np.sqrt(b*b - 4.0*c))/2.0
-
-    r = rs * np.sqrt(beta)
-
-    return z, r
 
 #-----------------------------------
 
-N = 500
-
-z1, r1 = cone(1.0, 1.0)
-z2, r2 = cone(2.0, 1.0)
-z3, r3 = cone(2.0, 0.3)
+# three cones in one call, (a, rs) = (1, 1), (2, 1) and (2, 0.3)
+z, r = quartic([1.0, 2.0, 2.0], [1.0, 1.0, 0.3], n=500)
+z1, z2, z3 = z
+r1, r2, r3 = r
 
 fig = plt.figure(figsize=[4,12])
 
@@ -3,38 +3,10 @@ from scipy.interpolate import griddata
 from scipy.spatial import cKDTree
 import plotly.graph_objects as go
 
-#-----------------------------------
-def cone(radial_distance = 1.0, angular_width = 60.0, style=0):
-    # the names of the arguments here follow the terminology
-    # used for CAT
-
-    # style = 0 is Gerono lemniscate
-    # style = 1 is Bernoulli lemniscate
-
-    N = 500
-
-    zmax = radial_distance
-
-    beta = np.radians(0.5*angular_width)
-    rmax = 0.2 * zmax * np.tan(beta)
-
-    tatz = np.arccos(0.2)
-    c2 = rmax / (np.cos(tatz)*np.sin(tatz))
-
-    t = np.linspace(0,np.pi/2,num=N+1,endpoint=False)[1:]
-
-    z = zmax * np.cos(t)
-    if style > 0:
-        z /= 1.+(np.sin(t)**2)
-
-    r = c2 * np.cos(t) * np.sin(t)
-    if style > 0:
-        r /= 1.+(np.sin(t)**2)
-
-    return z, r
+from conegeom import gerono
 
 #-----------------------------------
-z, r = cone()
+z, r = gerono(1.0, 60.0)
 
 # Create a 3D grid
 theta = np.linspace(0, 2*np.pi, 100)
@@ -0,0 +1,98 @@
+"""
+Profiles of the CME cone models: radius r against distance z along the
+cone axis.
+
+Three families are supported, with the parameters of the scripts they
+come from:
+
+    gerono, bernoulli   (radial_distance, angular_width), as gerono.py
+    quartic             (a, rs), as cone.py and projection.py
+
+Within a family every profile is one unit profile stretched along z and
+r: by radial_distance along z and radial_distance tan(angular_width/2)
+along r for the lemniscates, by sqrt(2) a and sqrt(2) a rs for the
+quartic.  The unit profiles (and the parameter grid t they are sampled
+on) are computed once per number of samples and cached, so a profile is
+two multiplications.  Parameters broadcast: arrays of shape P give
+(z, r) of shape P + (n,), e.g. 10k profiles in one call.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# default number of samples per profile
+N = 500
+
+# the lemniscates reach their widest point at z = 0.2 radial_distance
+TATZ = np.arccos(0.2)
+
+STYLES = ('gerono', 'bernoulli', 'quartic')
+
+#------------------------------------------------------------------------------
+@lru_cache(maxsize=8)
+def parameter_grid(n=N):
+    """The read-only grid t of the lemniscates, 0 < t < pi/2"""
+    t = np.linspace(0, np.pi/2, num=n+1, endpoint=False)[1:]
+    t.flags.writeable = False
+    return t
+
+@lru_cache(maxsize=16)
+def unit_profile(style, n=N):
+    """
+    Return read-only (z, r) of the unit profile of a style, see the
+    module docstring for how it is stretched
+    """
+    if style in ('gerono', 'bernoulli'):
+        t = parameter_grid(n)
+        z = np.cos(t)
+        r = np.cos(t) * np.sin(t) * (0.2/(np.cos(TATZ)*np.sin(TATZ)))
+        if style == 'bernoulli':
+            scale = 1.0 + np.sin(t)**2
+            z /= scale
+            r /= scale
+    elif style == 'quartic':
+        z = np.linspace(0.0, 1.0, num=n)
+        alpha = z*z
+        b = 2.0*alpha + 1.0
+        c = alpha*(alpha - 1.0)
+        beta = (- b + np.sqrt(b*b - 4.0*c))/2.0
+        r = np.sqrt(np.maximum(beta, 0.0))
+    else:
+        raise ValueError(f"unknown cone style {style!r}, expected one of {STYLES}")
+
+    for v in (z, r):
+        v.flags.writeable = False
+    return z, r
+
+def _stretch(style, zscale, rscale, n):
+    zu, ru = unit_profile(style, n)
+    zscale, rscale = np.broadcast_arrays(np.asarray(zscale, dtype=float),
+                                         np.asarray(rscale, dtype=float))
+    return zscale[..., None] * zu, rscale[..., None] * ru
+
+#------------------------------------------------------------------------------
+def lemniscate(radial_distance, angular_width, style=0, n=N):
+    """
+    Return (z, r) of Gerono (style 0) or Bernoulli (style 1) lemniscate
+    cones of the given radial distances and angular widths (degrees)
+    """
+    zmax = np.asarray(radial_distance, dtype=float)
+    rmax = zmax * np.tan(np.radians(0.5*np.asarray(angular_width, dtype=float)))
+    return _stretch('bernoulli' if style > 0 else 'gerono', zmax, rmax, n)
+
+def gerono(radial_distance, angular_width, n=N):
+    """Return (z, r) of Gerono lemniscate cones, see lemniscate()"""
+    return lemniscate(radial_distance, angular_width, style=0, n=n)
+
+def bernoulli(radial_distance, angular_width, n=N):
+    """Return (z, r) of Bernoulli lemniscate cones, see lemniscate()"""
+    return lemniscate(radial_distance, angular_width, style=1, n=n)
+
+def quartic(a, rs, n=N):
+    """
+    Return (z, r) of the quartic cones of cone.py, with z from 0 to
+    sqrt(2) a and rs the ratio of width to length
+    """
+    d = np.sqrt(2.0) * np.asarray(a, dtype=float)
+    return _stretch('quartic', d, d * np.asarray(rs, dtype=float), n)
@@ -0,0 +1,209 @@
+"""
+Precomputed grid of projected cone outlines for instant lookups.
+
+The outline of a cone scales linearly with its size a (see coneproj.py:
+the size only stretches the cone), so the grid only spans latitude,
+longitude and half angle psi, at a = 1; a lookup multiplies by a.
+
+Each outline is stored in polar form about a center on the projected
+axis (the widest point of the cone, which is always inside the outline):
+the center and the outline radius at nvertices equally spaced polar
+angles, counted from the projected axis.  Both change smoothly with the
+cone parameters, unlike the vertices of coneproj.outline(), whose
+tangent points jump along the edge where the outline is nearly straight,
+so in between grid nodes they are interpolated from the eight
+surrounding nodes (in tan(psi) for the half angle, which the cross
+sections scale with).  A lookup costs the same whatever the grid size.
+
+On the default grid the distance between an interpolated outline and
+the exact one (both ways, nearest point on the other polygon) is a
+median 0.11%, 95th percentile 0.44% and at most 1.5% of the cone length
+sqrt(2) a, over 4000 random cones; the worst cases are the widest cones,
+whose rounded corners fall between the polar angles.
+
+Grids are stored in the on-disk array cache (arraycache.py), keyed on
+their resolution, and memory-mapped back in, so each one is built once.
+Building one computes a latitude row per task in a process pool.
+"""
+
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from arraycache import CubeCache, source_key
+from coneproj import cone_profile, outlines, rotation_matrices
+
+# exact vertices per grid vertex, for the polar form of an outline
+OVERSAMPLE = 4
+
+#------------------------------------------------------------------------------
+def _cross(a, b):
+    return a[..., 0]*b[..., 1] - a[..., 1]*b[..., 0]
+
+def _axis_angle(center):
+    # the center is on the projected axis, so it gives its direction
+    # (arbitrary, but then the outline is round, for a cone seen end on)
+    return np.arctan2(center[..., 1], center[..., 0])
+
+def polar_outlines(latitude, longitude, psi, nvertices=128, nz=400):
+    """
+    Return the (N, 2) centers and (N, nvertices) radii of the outlines of
+    N cones at a = 1, the radii at polar angles 2 pi i/nvertices from
+    the projected axis, about the centers (see the module docstring)
+    """
+    latitude, longitude, psi = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=float)) for v in (latitude, longitude, psi)))
+    exact = outlines(latitude, longitude, psi, 1.0, OVERSAMPLE*nvertices, nz)
+
+    z, r, slope = cone_profile(nz)
+    center = np.sqrt(2.0) * z[np.argmax(r)] * rotation_matrices(latitude, longitude)[:, 1:, 2]
+
+    # polar angles of the exact vertices, which go round the center once
+    # counterclockwise, unwrapped to increase and closed with the first
+    rel = exact - center[:, None]
+    n, m = rel.shape[:2]
+    phi = np.arctan2(rel[..., 1], rel[..., 0])
+    steps = np.maximum((np.diff(phi, axis=1) + np.pi) % (2*np.pi) - np.pi, 0.0)
+    phi = np.concatenate([phi[:, :1], phi[:, :1] + np.cumsum(steps, axis=1),
+                          phi[:, :1] + 2*np.pi], axis=1)
+    rel = np.concatenate([rel, rel[:, :1]], axis=1)
+
+    # the edge that each ray from the center crosses, by one binary
+    # search over all cones (offset to keep their angles apart)
+    theta = _axis_angle(center)[:, None] + np.arange(nvertices) * (2*np.pi/nvertices)
+    angle = phi[:, :1] + (theta - phi[:, :1]) % (2*np.pi)
+    offset = 4*np.pi * np.arange(n)[:, None]
+    j = np.searchsorted((phi + offset).ravel(), (angle + offset).ravel(), side='right')
+    j = np.clip(j.reshape(n, nvertices) - (m + 1)*np.arange(n)[:, None], 1, m)
+
+    rows = np.arange(n)[:, None]
+    p0 = rel[rows, j - 1]
+    edge = rel[rows, j] - p0
+    ray = np.stack([np.cos(angle), np.sin(angle)], axis=-1)
+    # a ray through a vertex may land on a repeated one (a zero edge),
+    # where the vertex itself is the crossing
+    radius = np.hypot(p0[..., 0], p0[..., 1])
+    cross = _cross(ray, edge)
+    np.divide(_cross(p0, edge), cross, out=radius, where=(np.abs(cross) > 1e-12))
+    return center, radius
+
+def _grid_row(latitude, longitudes, psis, nvertices, nz):
+    """
+    The (nlon, npsi, 2) centers and (nlon, npsi, nvertices) radii of the
+    outlines of one latitude, at a = 1
+    """
+    lon, psi = np.meshgrid(longitudes, psis, indexing='ij')
+    center, radius = polar_outlines(latitude, lon.ravel(), psi.ravel(), nvertices, nz)
+    return (center.reshape(lon.shape + (2,)).astype(np.float32),
+            radius.reshape(lon.shape + (nvertices,)).astype(np.float32))
+
+def build_grid(nlat=37, nlon=72, npsi=32, psi_range=(1.0, 80.0), nvertices=128,
+               nz=400, nworkers=0):
+    """
+    Return the (nlat, nlon, npsi, 2) float32 centers and (nlat, nlon,
+    npsi, nvertices) radii of the outlines at a = 1 for latitudes -90 to
+    90, longitudes 0 to 360 (exclusive) and half angles over psi_range
+    (degrees), computed by nworkers processes (0 means one per core,
+    None or 1 computes them here)
+    """
+    latitudes, longitudes, psis = grid_axes(nlat, nlon, npsi, psi_range)
+    center = np.empty((nlat, nlon, npsi, 2), dtype=np.float32)
+    radius = np.empty((nlat, nlon, npsi, nvertices), dtype=np.float32)
+
+    if nworkers is None or nworkers == 1:
+        for i, lat in enumerate(latitudes):
+            center[i], radius[i] = _grid_row(lat, longitudes, psis, nvertices, nz)
+    else:
+        with ProcessPoolExecutor(max_workers=nworkers or os.cpu_count()) as pool:
+            jobs = [pool.submit(_grid_row, lat, longitudes, psis, nvertices, nz)
+                    for lat in latitudes]
+            for i, job in enumerate(jobs):
+                center[i], radius[i] = job.result()
+
+    return center, radius
+
+def grid_axes(nlat, nlon, npsi, psi_range):
+    """Return the (latitudes, longitudes, psis) grid nodes in degrees"""
+    return (np.linspace(-90.0, 90.0, nlat),
+            np.arange(nlon) * (360.0/nlon),
+            np.linspace(psi_range[0], psi_range[1], npsi))
+
+def _bracket(value, start, step, n, periodic=False):
+    """Return the two neighbouring node indices of value and their weights"""
+    f = (value - start)/step
+    if periodic:
+        i = int(np.floor(f)) % n
+        t = f - np.floor(f)
+        return (i, (i + 1) % n), (1.0 - t, t)
+    i = min(max(int(np.floor(f)), 0), n - 2)
+    t = min(max(f - i, 0.0), 1.0)
+    return (i, i + 1), (1.0 - t, t)
+
+#------------------------------------------------------------------------------
+class OutlineGrid:
+    """
+    Interpolated lookups in a grid of outlines from build_grid().  Values
+    outside the latitude and psi ranges are clamped to the nearest node.
+    """
+
+    def __init__(self, center, radius, psi_range=(1.0, 80.0)):
+        self.center = center
+        self.radius = radius
+        nlat, nlon, npsi = radius.shape[:3]
+        self.psi_range = tuple(psi_range)
+        self.axes = grid_axes(nlat, nlon, npsi, psi_range)
+        self._theta = np.arange(self.nvertices) * (2*np.pi/self.nvertices)
+
+    @property
+    def nvertices(self):
+        return self.radius.shape[3]
+
+    def outline(self, latitude, longitude, psi, a):
+        """
+        Return the (nvertices, 2) outline of a cone, like coneproj.outline()
+        but with the vertices at equal polar angles about its center,
+        starting from the projected axis
+        """
+        nlat, nlon, npsi = self.radius.shape[:3]
+        psi0, psi1 = self.psi_range
+
+        ilat, wlat = _bracket(latitude, -90.0, 180.0/(nlat - 1), nlat)
+        ilon, wlon = _bracket(longitude, 0.0, 360.0/nlon, nlon, periodic=True)
+        ipsi, wpsi = _bracket(psi, psi0, (psi1 - psi0)/(npsi - 1), npsi)
+        # the cross sections scale with tan(psi), so weigh the psi nodes
+        # by that, which matters for wide cones
+        t0, t1, t = np.tan(np.radians([self.axes[2][ipsi[0]], self.axes[2][ipsi[1]], psi]))
+        t = min(max((t - t0)/(t1 - t0), 0.0), 1.0)
+        wpsi = (1.0 - t, t)
+
+        corners = np.ix_(ilat, ilon, ipsi)
+        weights = np.einsum('i,j,k->ijk', wlat, wlon, wpsi)
+        center = np.tensordot(weights, self.center[corners], axes=3)
+        radius = np.tensordot(weights, self.radius[corners], axes=3)
+        theta = _axis_angle(center) + self._theta
+        return a * (center + radius[:, None] * np.stack([np.cos(theta), np.sin(theta)], axis=-1))
+
+    __call__ = outline
+
+def outline_grid(nlat=37, nlon=72, npsi=32, psi_range=(1.0, 80.0), nvertices=128,
+                 nz=400, nworkers=0, cachedir=None):
+    """
+    Return an OutlineGrid at the given resolution, memory-mapped from the
+    array cache or built (see build_grid()) and stored there on a miss
+    """
+    params = dict(kind='conegrid-polar', nlat=nlat, nlon=nlon, npsi=npsi,
+                  psi_range=list(psi_range), nvertices=nvertices, nz=nz)
+    key = source_key([], **params)
+
+    cache = CubeCache(cachedir)
+    hit = cache.get(key)
+    if hit is None:
+        center, radius = build_grid(nlat, nlon, npsi, psi_range, nvertices, nz, nworkers)
+        arrays = {'center': center, 'radius': radius}
+        cache.put(key, arrays, params)
+        hit = cache.get(key) or (arrays, params)
+
+    arrays, meta = hit
+    return OutlineGrid(arrays['center'], arrays['radius'], psi_range)
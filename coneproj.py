@@ -0,0 +1,125 @@
+"""
+Plane-of-sky outline of the CME cone model.
+
+The cone of projection.py is a surface of revolution: at height z along
+its axis it is a circle of radius rho(z).  Seen from the observer (along
+x' after the rotation) its outline is the boundary of the convex set
+swept by those circles, so it is fully described by its support
+function: for a direction u in the sky plane,
+
+    h(u) = max_z [ w_z d z + rho(z) |w_xy| ],   w = M^T u,
+
+where M is the 2x3 rotation-and-projection onto (y', z').  The height
+that attains the maximum is the one where the circle is tangent to the
+outline, and the tangent point on that circle is along w_xy.  The
+profile is concave, so that height is where its slope dr/dz equals
+-w_z/|w_xy| (per unit rho), found by a binary search of the tabulated
+slopes.  Evaluating this for n directions gives the n vertices of the
+outline in order, with no point cloud, binning or convex hull, in well
+under a millisecond.
+
+outlines() does the same for arrays of cone parameters at once: the
+profile is shared, the rotations are stacked (N, 3, 3) matrices and the
+cones are processed in chunks, for parameter sweeps and ensembles.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from conegeom import unit_profile
+
+# bytes of work arrays per chunk of cones in outlines()
+CHUNK_BYTES = 32 * 2**20
+
+#------------------------------------------------------------------------------
+@lru_cache(maxsize=8)
+def cone_profile(nz=400):
+    """
+    Return (z, r, slope) for the unit cone: heights 0 to 1, the radius
+    at each (the quartic profile of conegeom.py) and the slope dr/dz
+    between them.  The profile is concave, so slope decreases.  The
+    arrays are read-only.
+    """
+    z, r = unit_profile('quartic', nz)
+    slope = np.diff(r) / np.diff(z)
+    slope.flags.writeable = False
+    return z, r, slope
+
+def rotation_matrices(latitude, longitude):
+    """
+    Return the (N, 3, 3) rotations taking cone coordinates (x0, y0, z0)
+    to (x', y', z') for cone axes at the given latitudes and longitudes
+    (degrees, scalars or arrays of length N).  x' is along the line of
+    sight, (y', z') is the sky plane.
+    """
+    theta = np.radians(90.0 - np.atleast_1d(np.asarray(latitude, dtype=float)))
+    phi = np.radians(np.atleast_1d(np.asarray(longitude, dtype=float)))
+    theta, phi = np.broadcast_arrays(theta, phi)
+
+    st, ct = np.sin(theta), np.cos(theta)
+    sp, cp = np.sin(phi), np.cos(phi)
+    zero = np.zeros_like(st)
+
+    return np.stack([np.stack([ct*cp, -sp, st*cp], axis=-1),
+                     np.stack([ct*sp, cp, st*sp], axis=-1),
+                     np.stack([-st, zero, ct], axis=-1)], axis=-2)
+
+def sky_matrix(latitude, longitude):
+    """
+    The 2x3 matrix taking cone coordinates (x0, y0, z0) to the sky plane
+    (y', z') for a cone axis at the given latitude and longitude (degrees)
+    """
+    return rotation_matrices(latitude, longitude)[0, 1:]
+
+def outline(latitude, longitude, psi, a, nvertices=200, nz=400):
+    """
+    Return the projected outline of the cone as an (nvertices, 2) array
+    of (y', z') points, ordered counterclockwise.  psi is the cone half
+    angle in degrees and a its size parameter, as in projection.py.
+    """
+    return outlines(latitude, longitude, psi, a, nvertices, nz)[0]
+
+def outlines(latitude, longitude, psi, a, nvertices=200, nz=400, chunk=None):
+    """
+    Return the (N, nvertices, 2) outlines of N cones, see outline().  The
+    parameters are scalars or arrays of length N; the cones are done
+    chunk at a time (default: about CHUNK_BYTES of work arrays).
+    """
+    latitude, longitude, psi, a = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=float)) for v in (latitude, longitude, psi, a)))
+    n = latitude.size
+
+    z, r, slope = cone_profile(nz)
+    m = rotation_matrices(latitude, longitude)[:, 1:]
+    d = np.sqrt(2.0) * a
+    rs = np.tan(np.radians(psi))
+
+    angle = np.linspace(0.0, 2*np.pi, nvertices, endpoint=False)
+    u = np.stack([np.cos(angle), np.sin(angle)], axis=1)
+
+    if chunk is None:
+        chunk = max(1, CHUNK_BYTES // (8 * 16 * nvertices))
+    out = np.empty((n, nvertices, 2))
+
+    for k0 in range(0, n, chunk):
+        k1 = min(k0 + chunk, n)
+        mk = m[k0:k1]
+        w = u @ mk
+        wxy = np.hypot(w[..., 0], w[..., 1])
+        s = rs[k0:k1, None] * wxy
+
+        # the height at which each direction touches the outline: the
+        # last one where w_z z + s r(z) still increases, i.e. the profile
+        # slope exceeds -w_z/s.  The size d scales the whole cone, so it
+        # does not move it.
+        with np.errstate(invalid='ignore', divide='ignore'):
+            j = np.searchsorted(-slope, w[..., 2]/s)
+
+            # and the tangent point on the circle at that height
+            scale = np.where(wxy > 0, rs[k0:k1, None] * r[j]/wxy, 0.0)
+        points = np.stack([scale*w[..., 0], scale*w[..., 1], z[j]], axis=-1)
+
+        out[k0:k1] = d[k0:k1, None, None] * (points @ mk.transpose(0, 2, 1))
+
+    return out
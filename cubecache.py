@@ -0,0 +1,149 @@
+"""
+Preprocessed image cubes, cached on disk.
+
+Scaling a sequence to uint8 (and building its pyramid) is the same work on
+every restart of an app, so the results are stored in the array cache
+(see arraycache.py) and memory-mapped straight back in on the next run.
+"""
+
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+
+from numpy.lib.format import open_memmap
+
+from arraycache import CubeCache, source_key
+from background import background as make_background
+from difference import DifferenceCube
+from fitsload import load_sequence, scratch_cube
+from polar import PolarCube
+from pyramid import build_pyramid, level_shape
+from radial import NRGFCube
+from scaling import scale_to_uint8
+from stats import sequence_histogram
+
+log = logging.getLogger(__name__)
+
+#------------------------------------------------------------------------------
+def filtered_sequence(images, background=None, window=None, nrgf=False,
+                      difference=None, ref=0, step=1, polar=None, nworkers=None):
+    """
+    Return the lazy cube of images after the given processing, in order:
+    If background is 'median' or 'min' that background (over the whole
+    sequence, or window frames) is subtracted, see background().  With
+    nrgf the frames then go through the radial filter, see radial.py.
+    If difference is 'running', 'base' or 'ratio' the difference images
+    (with respect to frame ref, or step frames back) are taken, see
+    DifferenceCube.  If polar is (npa, nr) the frames are finally
+    remapped to (nr, npa) polar images, see polar.py.
+    """
+    if background is not None:
+        bg = make_background(images, background, window=window, nworkers=nworkers)
+        images = DifferenceCube(images, 'background', background=bg)
+    if nrgf:
+        images = NRGFCube(images)
+    if difference is not None:
+        images = DifferenceCube(images, difference, ref=ref, step=step)
+    if polar is not None:
+        images = PolarCube(images, *polar)
+    return images
+
+def _staged_arrays(cache, key, shapes):
+    """
+    Return (staging, arrays): uint8 arrays of the given shapes, opened
+    as .npy files in a staging directory of the cache, or in memory
+    (with staging None) if the cache cannot be written
+    """
+    staging = None
+    try:
+        staging = cache.staging(key)
+        arrays = {name: open_memmap(os.path.join(staging, name + '.npy'), mode='w+',
+                                    dtype=np.uint8, shape=shape)
+                  for name, shape in shapes.items()}
+    except OSError:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+        return None, {name: np.empty(shape, dtype=np.uint8) for name, shape in shapes.items()}
+    return staging, arrays
+
+def _scale_frames(images, vmin, vmax, top, levels, reduce, arrays):
+    """
+    Scale every frame (and its pyramid levels) of images into arrays,
+    one frame at a time, so each is computed only once
+    """
+    lo = np.broadcast_to(vmin, (len(images),))
+    hi = np.broadcast_to(vmax, (len(images),))
+    for k in range(len(images)):
+        frame = images[k]
+        scale_to_uint8(frame[np.newaxis], lo[k], hi[k], top=top,
+                       out=arrays['cube'][k:k+1])
+        if levels > 1:
+            pyramid = build_pyramid(frame, levels, reduce)
+            for n in range(1, levels):
+                scale_to_uint8(pyramid[n][np.newaxis], lo[k], hi[k], top=top,
+                               out=arrays[f'level{n}'][k:k+1])
+
+def scaled_sequence(dir, files, top=254, levels=1, reduce='median', percentiles=(0, 100),
+                    per_frame=False, filters=None, nworkers=None, cache=None):
+    """
+    Return (arrays, meta) for the sequence of files in dir scaled to uint8.
+
+    arrays['cube'] is the full resolution (time, y, x) uint8 cube and,
+    for every pyramid level n = 1 ... levels-1, arrays[f'level{n}'] is
+    the same sequence downsampled by 2**n with a NaN ignoring median (or
+    mean, see reduce).  The clip levels are the given (lower, upper)
+    percentiles of the sequence, or of every frame if per_frame is True;
+    meta holds them as vmin and vmax (lists in the per-frame case).
+    filters is a dict of the keyword arguments of filtered_sequence(),
+    e.g. {'difference': 'running'}, to scale processed images instead.
+
+    Everything is served from the on-disk cache when possible; nworkers
+    is passed on to load_sequence() on a miss.  Processed frames are
+    computed only once, into a scratch file, and the uint8 arrays are
+    written straight into the cache entry.
+    """
+    if cache is None:
+        cache = CubeCache()
+    filters = dict(filters or {})
+
+    paths = [os.path.join(dir, f) for f in files]
+    key = source_key(paths, top=top, levels=levels, reduce=reduce,
+                     percentiles=list(percentiles), per_frame=per_frame,
+                     filters=filters)
+
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+
+    t0 = time.time()
+
+    source = load_sequence(dir, files, nworkers=nworkers)
+    images = filtered_sequence(source, nworkers=nworkers, **filters)
+    scratch = None if images is source else scratch_cube(images.shape, images.dtype)
+
+    hist = sequence_histogram(images, nworkers=nworkers, out=scratch)
+    if scratch is not None:
+        images = scratch
+    vmin, vmax = hist.clip_levels(*percentiles, per_frame=per_frame)
+
+    shapes = {'cube': images.shape}
+    for n in range(1, levels):
+        shapes[f'level{n}'] = (len(images),) + level_shape(images.shape[1:], n)
+
+    staging, arrays = _staged_arrays(cache, key, shapes)
+    _scale_frames(images, vmin, vmax, top, levels, reduce, arrays)
+
+    meta = {'vmin': np.asarray(vmin).tolist(), 'vmax': np.asarray(vmax).tolist(),
+            'levels': levels}
+
+    log.info("scaled %d frames in %.1f s", len(files), time.time() - t0)
+
+    if staging is None:
+        return arrays, meta
+    for a in arrays.values():
+        a.flush()
+    cache.commit(key, staging, list(arrays), meta)
+    return cache.get(key) or (arrays, meta)
@@ -4,26 +4,16 @@ This builds off of the example in ex_clientside.py
 
 import random
 
-from astropy.io import fits
 from dash import Dash, dcc, html
 from dash.dependencies import Input, Output, State
 import json
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
-import matplotlib.pyplot as plt
-import sunpy.visualization.colormaps as cm
 
-#------------------------------------------------------------------------------
-def matplotlib_to_plotly(cmap, pl_entries):
-    h = 1.0/(pl_entries-1)
-    pl_colorscale = []
-
-    for k in range(pl_entries):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        pl_colorscale.append([k*h, 'rgb'+str((C[0], C[1], C[2]))])
-
-    return pl_colorscale
+from colortables import plotly_scale
+from fitsload import load_sequence
+from scaling import data_range
 
 #------------------------------------------------------------------------------
 app = Dash(__name__)
@@ -45,33 +35,23 @@ files = [
     "STEREOA_L3_2012_09_16_143900.fts"
 ]
 
-imagelist = []
-for f in files:
-    fname = dir + '/' + f
-    hdu = fits.open(fname)[0]
-    imagelist.append(hdu.data)
-
-images = np.array(imagelist)
+images = load_sequence(dir, files)
 
 #------------------------------------------------------------------------------
 # load scaled data
 
-vmin = np.min(images)
-vmax = np.max(images)
-
-norm = 255.0/(vmax-vmin)
+vmin, vmax = data_range(images)
 
 #------------------------------------------------------------------------------
 # lasco/C2 color scale
 
-cmap_lasco = plt.get_cmap('soholasco2')
-cscale_lasco = matplotlib_to_plotly(cmap_lasco, 255)
+cscale_lasco = plotly_scale('soholasco2', 255)
 
 #------------------------------------------------------------------------------
 # for debugging
-#data = (norm*(images - vmin)).astype(np.uint8)
+#data = scale_to_uint8(images, vmin, vmax, top=255)
 
-data = images
+data = np.asarray(images)
 
 fig = px.imshow(data, animation_frame=0,
             binary_string = True,
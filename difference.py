@@ -0,0 +1,77 @@
+"""
+Difference imaging for CME sequences.
+
+A DifferenceCube wraps a (time, y, x) cube, e.g. a memory-mapped
+FitsCube, and computes difference images one frame at a time as they
+are indexed, so it can go anywhere the apps use a cube: the statistics,
+the uint8 scaling and hence the colorization path and the disk cache
+(see filtered_sequence(difference=...) in cubecache.py).  The modes are
+
+    running     cube[k] - cube[k-step]   (frames before step give 0)
+    base        cube[k] - cube[ref]
+    ratio       cube[k] / cube[ref]      (NaN where the reference is 0)
+    background  cube[k] - background     (or background[k], see background.py)
+
+The reference frame is read once; every other frame is read once per
+difference image, so the cost is a subtraction per frame on top of I/O.
+"""
+
+import numpy as np
+
+from lazycube import LazyCube
+
+MODES = ('running', 'base', 'ratio', 'background')
+
+#------------------------------------------------------------------------------
+class DifferenceCube(LazyCube):
+    """
+    A lazy (time, y, x) cube of difference images of another cube,
+    indexed like a FitsCube.  See the module docstring for the modes.
+    """
+
+    def __init__(self, cube, mode='running', ref=0, step=1, background=None):
+        if mode not in MODES:
+            raise ValueError(f"unknown difference mode {mode!r}, use one of {MODES}")
+        if step < 1:
+            raise ValueError("step must be at least 1")
+        if (mode == 'background') != (background is not None):
+            raise ValueError("a background is needed for, and only for, mode 'background'")
+
+        self.cube = cube
+        self.mode = mode
+        self.ref = range(len(cube))[ref]
+        self.step = step
+        self.shape = tuple(cube.shape)
+        self.dtype = np.result_type(np.dtype(cube.dtype).newbyteorder('='), np.float32)
+
+        self._ref = None
+        if mode in ('base', 'ratio'):
+            self._ref = np.asarray(cube[self.ref], dtype=self.dtype)
+        self.background = background
+
+    def frame(self, k, out=None):
+        """Return difference image k, written into out if given"""
+        k = range(len(self))[k]
+        if out is None:
+            out = np.empty(self.shape[1:], dtype=self.dtype)
+
+        a = self.cube[k]
+        if self.mode == 'running':
+            # frames before step have nothing to difference with: a - a
+            # gives 0, keeping the NaNs (e.g. the occulter) of the frame
+            b = self.cube[k - self.step] if k >= self.step else a
+        elif self.mode == 'background':
+            b = self.background if self.background.ndim == 2 else self.background[k]
+        else:
+            b = self._ref
+
+        if self.mode == 'ratio':
+            out.fill(np.nan)
+            np.divide(a, b, out=out, where=(b != 0))
+        else:
+            np.subtract(a, b, out=out)
+        return out
+
+    def __repr__(self):
+        return (f"DifferenceCube(mode={self.mode!r}, shape={self.shape}, "
+                f"dtype={self.dtype})")
@@ -0,0 +1,63 @@
+"""
+Display transforms for quantized image cubes.
+
+Once a sequence has been scaled to integer indices (uint8, or uint16 for
+finer quantization), gamma correction, color saturation (cmin/cmax) and
+the colormap are all functions of the index alone.  They are composed
+here into a single lookup table with one entry per input level, so that
+a slider change costs one LUT gather per frame instead of a power() over
+the whole floating point cube.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from colorize import colorize
+from colortables import rgb_table
+
+#------------------------------------------------------------------------------
+@dataclass(frozen=True)
+class DisplayTransform:
+    """
+    Parameters that map an index in [0, top] to an RGB color:
+    saturation to [cmin, cmax], then gamma, then the colormap cmap
+    sampled with ncolors entries.
+    """
+    cmap: str = 'soholasco2'
+    gamma: float = 1.0
+    cmin: float = 0
+    cmax: float = 254
+    top: int = 254
+    ncolors: int = 255
+
+    @property
+    def nlevels(self):
+        # 256 entries for uint8 input, 65536 for uint16
+        return 256 if self.top < 256 else 65536
+
+    def lut(self):
+        return display_lut(self)
+
+#------------------------------------------------------------------------------
+@lru_cache(maxsize=64)
+def display_lut(t):
+    """Return the (nlevels, 3) uint8 lookup table for DisplayTransform t"""
+    x = np.arange(t.nlevels, dtype=float)
+
+    x = (x - t.cmin)/max(t.cmax - t.cmin, 1e-12)
+    np.clip(x, 0.0, 1.0, out=x)
+
+    if t.gamma != 1.0:
+        np.power(x, t.gamma, out=x)
+
+    cidx = ((t.ncolors - 1)*x).astype(np.intp)
+
+    lut = np.take(rgb_table(t.cmap, t.ncolors), cidx, axis=0)
+    lut.flags.writeable = False
+    return lut
+
+def apply_display(indices, t, out=None):
+    """Colorize an index image or cube through DisplayTransform t"""
+    return colorize(indices, display_lut(t), out=out)
@@ -0,0 +1,182 @@
+"""
+Shared loader for sequences of FITS images.
+
+The apps used to read every frame into memory with fits.open(), append
+it to a list and then copy the whole list again with np.array().  Here
+the sequence is exposed as a lazily materialized (time, y, x) cube backed
+by memory-mapped FITS data, so only the frames that are actually touched
+get paged in and there is never a second full copy of the sequence.
+
+Long sequences can instead be decoded in parallel by a pool of worker
+processes that write straight into a preallocated, memory-mapped cube.
+"""
+
+import os
+import tempfile
+import threading
+import weakref
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from astropy.io import fits
+
+import numpy as np
+
+from lazycube import LazyCube
+
+# number of frames whose memory maps (and file handles) a FitsCube keeps
+MAX_FRAMES = 8
+
+#------------------------------------------------------------------------------
+class FitsCube(LazyCube):
+    """
+    A (time, y, x) image cube whose frames are memory-mapped from a list
+    of FITS files.  Indexing follows numpy: cube[k] is a single frame,
+    cube[k, i, j] a pixel and cube[a:b] a stacked (native) array.
+
+    Every memory map holds an open file descriptor until it is garbage
+    collected, so only the maps of the last maxframes frames are kept.
+    Frames can be read from several threads at once.
+    """
+
+    def __init__(self, paths, maxframes=MAX_FRAMES):
+        self.paths = list(paths)
+        if len(self.paths) == 0:
+            raise ValueError("FitsCube needs at least one file")
+
+        self.maxframes = maxframes
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+        first = self.frame(0)
+        self.shape = (len(self.paths),) + first.shape
+        self.dtype = first.dtype.newbyteorder('=')
+
+    def frame(self, k, out=None):
+        """
+        Return frame k as a (read-only) memory-mapped array, or copied
+        into out if given
+        """
+        k = range(len(self.paths))[k]
+        with self._lock:
+            data = self._frames.get(k)
+            if data is not None:
+                self._frames.move_to_end(k)
+
+        if data is None:
+            with fits.open(self.paths[k], memmap=True) as hdul:
+                data = hdul[0].data
+            with self._lock:
+                # keep the map of another thread that got here first
+                data = self._frames.setdefault(k, data)
+                self._frames.move_to_end(k)
+                # dropping the oldest map closes its file once no caller
+                # holds on to the array any more
+                while len(self._frames) > self.maxframes:
+                    self._frames.popitem(last=False)
+
+        if out is None:
+            return data
+        out[...] = data
+        return out
+
+#------------------------------------------------------------------------------
+def _read_frames(scratch, shape, dtype, start, paths):
+    # runs in a worker process: decode frames start, start+1, ... and
+    # write them (byte-swapped to native order) into the shared cube
+    out = np.memmap(scratch, dtype=dtype, mode='r+', shape=shape)
+    for k, path in enumerate(paths, start):
+        with fits.open(path, memmap=True) as hdul:
+            out[k] = hdul[0].data
+    out.flush()
+    del out
+    return len(paths)
+
+def _remove_scratch(path):
+    try:
+        os.remove(path)
+    except OSError:
+        # still mapped by a view of the cube
+        pass
+
+def scratch_cube(shape, dtype, scratch_dir=None, unlink=True):
+    """
+    Return a writable np.memmap of the given shape and dtype backed by a
+    temporary file in scratch_dir, which goes away with the array.
+
+    On POSIX systems the file is unlinked right away, unless unlink is
+    False: then it keeps its name (cube.filename), e.g. for worker
+    processes to open, until the caller removes it.  Otherwise, and
+    elsewhere, it is removed when the array is garbage collected, or at
+    exit.
+    """
+    fd, scratch = tempfile.mkstemp(prefix='pycat-', suffix='.cube', dir=scratch_dir)
+    os.close(fd)
+
+    try:
+        cube = np.memmap(scratch, dtype=dtype, mode='w+', shape=shape)
+    except BaseException:
+        _remove_scratch(scratch)
+        raise
+    # an open file cannot be removed on every system, so remove it once
+    # the array is garbage collected (or at exit); if it is already
+    # gone this does nothing
+    weakref.finalize(cube, _remove_scratch, scratch)
+    if unlink and os.name == 'posix':
+        os.remove(scratch)
+    return cube
+
+def read_sequence(paths, nworkers=0, scratch_dir=None):
+    """
+    Decode all frames in parallel and return them as a native-endian
+    np.memmap of shape (time, y, x).
+
+    nworkers is the number of worker processes (0 means one per core).
+    The cube lives in a temporary file in scratch_dir (default: the
+    system temp directory), which should be on a local disk, see
+    scratch_cube().  On POSIX systems the file is unlinked once the
+    workers are done.
+
+    Worker processes are forked from the caller; on platforms that spawn
+    them instead (Windows, macOS) call this under `if __name__ == "__main__"`.
+    """
+    paths = list(paths)
+    if nworkers == 0:
+        nworkers = os.cpu_count()
+
+    first = FitsCube(paths[:1])
+    shape = (len(paths),) + first.shape[1:]
+    dtype = first.dtype
+
+    cube = scratch_cube(shape, dtype, scratch_dir, unlink=False)
+    try:
+        # a few chunks per worker keeps the load balanced without
+        # paying for one task per frame
+        nchunks = min(len(paths), 4*nworkers)
+        bounds = np.linspace(0, len(paths), nchunks+1).astype(int)
+
+        with ProcessPoolExecutor(max_workers=nworkers) as pool:
+            jobs = [pool.submit(_read_frames, cube.filename, shape, dtype,
+                                int(i1), paths[i1:i2])
+                    for i1, i2 in zip(bounds[:-1], bounds[1:])]
+            for job in jobs:
+                job.result()
+    finally:
+        if os.name == 'posix':
+            _remove_scratch(cube.filename)
+
+    return cube
+
+def load_sequence(dir, files, nworkers=None):
+    """
+    Return the (time, y, x) cube for the given list of files in directory dir.
+
+    By default this is a lazily loaded FitsCube.  If nworkers is given
+    (0 for one worker per core) the frames are decoded up front by that
+    many processes instead, see read_sequence().
+    """
+    paths = [os.path.join(dir, f) for f in files]
+    if nworkers is None or nworkers == 1:
+        return FitsCube(paths)
+    return read_sequence(paths, nworkers=nworkers)
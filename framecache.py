@@ -0,0 +1,137 @@
+"""
+Bounded LRU cache of encoded (PNG/JPEG) movie frames.
+
+px.imshow(..., binary_string=True) re-encodes every frame each time a
+figure is rebuilt, even if the same frame was encoded with the same
+display settings a moment ago.  FrameEncoder encodes frames of a
+quantized cube through a DisplayTransform and keeps the results in a
+FrameCache keyed on (frame index, transform, codec), evicting the least
+recently used frames once the cache holds more than maxbytes.
+"""
+
+import base64
+import io
+import threading
+
+from collections import OrderedDict
+
+import numpy as np
+
+from PIL import Image
+
+from display import apply_display
+
+# default size bound, 256 MB
+FRAME_CACHE_BYTES = 256 * 1024**2
+
+MIME_TYPES = {'png': 'image/png', 'jpg': 'image/jpeg'}
+
+# zlib compression level for png (the plotly default), quality for jpg
+LEVELS = {'png': 4, 'jpg': 90}
+
+#------------------------------------------------------------------------------
+def encode_image(rgb, codec='png', level=None):
+    """
+    Encode an (y, x, 3) uint8 image as bytes.  level is the zlib
+    compression level for png or the quality for jpg (see LEVELS).
+    """
+    if level is None:
+        level = LEVELS.get(codec)
+    buf = io.BytesIO()
+    im = Image.fromarray(np.ascontiguousarray(rgb))
+    if codec == 'png':
+        im.save(buf, format='PNG', compress_level=level)
+    elif codec == 'jpg':
+        im.save(buf, format='JPEG', quality=level)
+    else:
+        raise ValueError(f"unknown codec {codec}")
+    return buf.getvalue()
+
+def data_uri(data, codec='png'):
+    """Wrap encoded image bytes as a data URI, as used by binary_string figures"""
+    return f"data:{MIME_TYPES[codec]};base64," + base64.b64encode(data).decode()
+
+#------------------------------------------------------------------------------
+class FrameCache:
+    """A thread-safe LRU mapping bounded by the total size of its values"""
+
+    def __init__(self, maxbytes=FRAME_CACHE_BYTES):
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        size = len(value)
+        if size > self.maxbytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old)
+            self._items[key] = value
+            self.nbytes += size
+            while self.nbytes > self.maxbytes:
+                _, old = self._items.popitem(last=False)
+                self.nbytes -= len(old)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {'frames': len(self._items), 'bytes': self.nbytes,
+                'hits': self.hits, 'misses': self.misses}
+
+#------------------------------------------------------------------------------
+class FrameEncoder:
+    """
+    Encode frames of a quantized (time, y, x) cube through display
+    transforms, caching the results.  Encoders may share a cache as long
+    as they are given distinct names.
+    """
+
+    def __init__(self, cube, cache=None, name=None, level=None):
+        self.cube = cube
+        self.cache = cache if cache is not None else FrameCache()
+        self.name = name if name is not None else id(cube)
+        self.level = level
+        self._rgb = np.empty(cube.shape[1:] + (3,), dtype=np.uint8)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.cube)
+
+    def encode(self, k, transform, codec='png'):
+        """Return frame k encoded with codec, as bytes"""
+        key = (self.name, k, transform, codec)
+        data = self.cache.get(key)
+        if data is None:
+            # the colorized frame goes through a reused buffer
+            with self._lock:
+                apply_display(self.cube[k], transform, out=self._rgb)
+                data = encode_image(self._rgb, codec=codec, level=self.level)
+            self.cache.put(key, data)
+        return data
+
+    def data_uri(self, k, transform, codec='png'):
+        return data_uri(self.encode(k, transform, codec), codec)
+
+    def data_uris(self, transform, codec='png'):
+        return [self.data_uri(k, transform, codec) for k in range(len(self.cube))]
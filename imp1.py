@@ -6,15 +6,16 @@ Then the intention is to modify it to do image processing on a single image.
 
 from astropy.io import fits
 from dash import Dash, dcc, html, Input, Output, State
-from skimage.measure import block_reduce
 
-import matplotlib.pyplot as plt
 import numpy as np
-import json
-import sunpy.visualization.colormaps as cm
 
 import plotly.express as px
 
+from colortables import plotly_scale
+from metrics import instrument
+from pyramid import reduce_frame
+from scaling import data_range, scale_to_uint8
+
 #------------------------------------------------------------------------------
 # create app object
 
@@ -32,13 +33,11 @@ hdu = fits.open(fname)[0]
 im = hdu.data
 
 # downsample to 512 x 512
-im = block_reduce(hdu.data, block_size = 2, func = np.nanmedian, cval = np.nanmin(im))
+im = reduce_frame(im, 2, 'median')
 
-vmin = np.min(im)
-vmax = np.max(im)
-norm = 1.0 / (vmax-vmin)
+vmin, vmax = data_range(im[np.newaxis])
 
-image_data = (254*norm*(im - vmin)).astype(np.uint8)
+image_data = scale_to_uint8(im[np.newaxis], vmin, vmax, top=254)[0]
 
 print(f"Image range {np.min(image_data)} {np.max(image_data)}")
 print(f"Image size {image_data.shape}")
@@ -46,21 +45,9 @@ print(f"Image size {image_data.shape}")
 #------------------------------------------------------------------------------
 # color table
 
-def matplotlib_to_plotly(cmap, ncolors):
-    h = 1.0/(ncolors-1)
-    pl_colorscale = []
-
-    for k in range(ncolors):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        pl_colorscale.append([k*h, 'rgb'+str((C[0], C[1], C[2]))])
-
-    return pl_colorscale
+cscale_lasco = plotly_scale('soholasco2', 256)
 
-cmap_lasco = plt.get_cmap('soholasco2')
-cscale_lasco = matplotlib_to_plotly(cmap_lasco,256)
-
-nidx = np.arange(256,dtype='float')/255
-cscale_buffer = cscale_lasco.copy()
+cscale_buffer = [list(c) for c in cscale_lasco]
 
 #------------------------------------------------------------------------------
 # create figure
@@ -90,11 +77,12 @@ fig.update_layout({
 
 app.layout = html.Div([
     dcc.Graph(
-        id='graph'
+        id='graph',
+        figure=fig
     ),
     dcc.Store(
-        id = 'figure-store',
-        data = fig
+        id = 'colorscale-base',
+        data = cscale_buffer
     ),
     dcc.Store(
         id = 'colorscale',
@@ -136,43 +124,42 @@ app.layout = html.Div([
 #        newcs[i][1] = cscale_lasco[newidx[i]][1]
 #    return newcs
 
-@app.callback(
-    Output("figure-store", "data"),
+# gamma is folded into the color table in the browser: only the 256
+# entry colorscale changes, the image data never leaves the page
+app.clientside_callback(
+    """
+    function(gamma, base) {
+        return base.map((c, i) => [c[0], base[Math.floor(255*Math.pow(i/255, 1.0/gamma))][1]]);
+    }
+    """,
+    Output("colorscale", "data"),
     Input("gamma-slider","value"),
-    State("figure-store","data"),
-    State("colorscale","data")
+    State("colorscale-base","data")
 )
-def update_colorscale(gamma, figure, newcs):
-    newidx = (255*np.power(nidx,(1.0/gamma))).astype(np.uint8)
-
-    for i in np.arange(len(newcs)):
-        newcs[i][1] = cscale_lasco[newidx[i]][1]
-
-    figure["layout"]["coloraxis"]["colorscale"] = newcs
-
-    return figure
 
+# merge the colorscale and range into the figure already on the page
 app.clientside_callback(
     """
-    function(rng, figure) {
-        if(figure === undefined) {
-            return {'data': [], 'layout': {}};
+    function(rng, cscale, figure) {
+        if(figure === undefined || figure === null) {
+            return window.dash_clientside.no_update;
         }
-        const fig = Object.assign({}, figure, {
+        return Object.assign({}, figure, {
             'layout': {
                 ...figure.layout,
                 'coloraxis': {
                     ...figure.layout.coloraxis,
+                    colorscale: cscale,
                     cmin: rng[0], cmax: rng[1]
                 }
             }
         });
-        return fig;
     }
     """,
     Output('graph', 'figure'),
     Input('range-slider', 'value'),
-    Input('figure-store', 'data')
+    Input('colorscale', 'data'),
+    State('graph', 'figure')
 )
 
 # A try at gamma correction - not working
@@ -201,16 +188,20 @@ app.clientside_callback(
 #    State('figure-store', 'data')
 #)
 
-@app.callback(
+# the layout is dumped in the browser, the figure is not sent back
+app.clientside_callback(
+    """
+    function(figure) {
+        return '```\\n' + JSON.stringify(figure.layout, null, 2) + '\\n```';
+    }
+    """,
     Output('figure-contents', 'children'),
     Input('graph', 'figure')
 )
-def print_figure_contents(data):
-#    return '```\n'+json.dumps(data, indent=2)+'\n```'
-    return '```\n'+json.dumps(data["layout"], indent=2)+'\n```'
-#    return '```\n'+json.dumps(data["layout"]["coloraxis"], indent=2)+'\n```'
-#    return '```\n'+json.dumps(data["name"], indent=2)+'\n```'
 
 
+# per-callback timings at /metrics when PYCAT_METRICS is set
+instrument(app)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
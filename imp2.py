@@ -4,19 +4,23 @@ This starts out as just an example where a clientside callback works.
 Then the intention is to modify it to do image processing on a single image.
 """
 
-from astropy.io import fits
 #from dash import Dash, dcc, html, Input, Output, State
 from dash import dcc
 from dash_extensions.enrich import Output, DashProxy, Input, State, MultiplexerTransform, html
-from skimage.measure import block_reduce
 
-import matplotlib.pyplot as plt
 import numpy as np
-import json
-import sunpy.visualization.colormaps as cm
 
 import plotly.express as px
 
+from colortables import plotly_scale
+from cubecache import scaled_sequence
+from display import DisplayTransform
+from framecache import FrameEncoder
+from jmap import jmap
+from metrics import instrument
+from playback import playback_layout, register_frames, register_playback, transform_query
+from pyramid import pick_level
+
 #------------------------------------------------------------------------------
 # create app object
 
@@ -41,69 +45,66 @@ files = [
     "STEREOA_L3_2012_09_16_143900.fts"
 ]
 
-fullres = []
-for f in files:
-    fname = dir + '/' + f
-    hdu = fits.open(fname)[0]
-    fullres.append(hdu.data)
-fullres = np.array(fullres)
-
-print(f"fullres {fullres.shape}")
-
-vmin = np.min(fullres)
-vmax = np.max(fullres)
-norm = 1.0 / (vmax-vmin)
-
-# downsample to 512 x 512
-# and render as uint8
-images = []
-cval = np.nanmin(fullres)
-for n in np.arange(fullres.shape[0]):
-    im = block_reduce(fullres[n,:,:],
-            block_size = 2,
-            func = np.nanmedian,
-            cval = cval)
-    image_data = (254*norm*(im - vmin)).astype(np.uint8)
-    images.append(image_data)
-images = np.array(images)
+# number of processes used to decode the files on a cache miss: None
+# reads frames lazily as they are needed, 0 decodes them on every core
+nworkers = None
 
-# reference image
+# difference imaging: None shows the images themselves, 'running' the
+# change since the previous frame, 'base' and 'ratio' the change with
+# respect to the reference frame
+difference = None
 ref_frame = 4
+
+# radial filter (NRGF) to bring out faint structure far from the occulter
+nrgf = False
+
+# (npa, nr) to show (height, position angle) polar images instead, e.g.
+# (360, 256), None for the images as they are
+polar = None
+
+# filtered images are dominated by a few outliers, so clip them at percentiles
+percentiles = (0, 100) if difference is None and not nrgf else (1, 99)
+
+# render as uint8 together with a 1/2, 1/4, 1/8 resolution pyramid
+# the result is cached on disk, so warm restarts skip the FITS files
+filters = dict(nrgf=nrgf, difference=difference, ref=ref_frame, polar=polar)
+arrays, meta = scaled_sequence(dir, files, top=254, levels=4, percentiles=percentiles,
+                               filters=filters, nworkers=nworkers)
+
+print(f"fullres {arrays['cube'].shape}")
+
+# the figure is 600 pixels high, so show the level closest to that
+height = 600
+level = pick_level(arrays['cube'].shape[1:], height, meta['levels'])
+
+vmin, vmax = meta['vmin'], meta['vmax']
+images = arrays[f'level{level}'] if level > 0 else arrays['cube']
+
+# reference image
 image_data = images[ref_frame,:,:]
 
 print(f"Image range {np.min(image_data)} {np.max(image_data)}")
 print(f"Image size {image_data.shape}")
 
-# buffer for movie data
-rgbimages = np.zeros((images.shape[0],images.shape[1],images.shape[2],3),
-                dtype=np.uint8)
-
-#------------------------------------------------------------------------------
-# color table
+# movie frames, encoded on demand and cached
+encoder = FrameEncoder(images)
 
-def matplotlib_to_plotly(cmap, ncolors):
-    h = 1.0/(ncolors-1)
-    pl_colorscale = []
+def movie_transform(gamma, rng):
+    # same mapping as the colorscale: gamma is applied to the color table
+    # (hence 1/gamma here) and the saturation range clips the indices
+    return DisplayTransform('soholasco2', gamma=1.0/gamma, cmin=rng[0], cmax=rng[1])
 
-    for k in range(ncolors):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        pl_colorscale.append([k*h, 'rgb'+str((C[0], C[1], C[2]))])
+register_frames(app.server, encoder, '/frames')
 
-    return pl_colorscale
+# height-time maps along every degree of position angle, (pa, time, height)
+jmaps = jmap(arrays['cube'], pas=range(360)) if polar is None else None
 
-def plotly_to_rgb(cscale):
-    ncolors = len(cscale)
-    rgbmap = np.zeros((ncolors,3), dtype=np.uint8)
-    for k in range(ncolors):
-        s = cscale[k][1]
-        rgbmap[k,:] = np.uint8(s[s.find('(')+1:s.find(')')].split(','))
-    return rgbmap
+#------------------------------------------------------------------------------
+# color table
 
-cmap_lasco = plt.get_cmap('soholasco2')
-cscale_lasco = matplotlib_to_plotly(cmap_lasco,256)
+cscale_lasco = plotly_scale('soholasco2', 256)
 
-nidx = np.arange(256,dtype='float')/255
-cscale_buffer = cscale_lasco.copy()
+cscale_buffer = [list(c) for c in cscale_lasco]
 
 #------------------------------------------------------------------------------
 # create figure
@@ -123,7 +124,7 @@ fig.update_layout({
         "visible": False
     },
     "showlegend": False,
-    "height": 600,
+    "height": height,
     "paper_bgcolor": "black",
     "plot_bgcolor": "black",
 })
@@ -134,14 +135,15 @@ fig.update_layout({
 app.layout = html.Div([
     dcc.Graph(
         id='graph',
+        figure=fig,
         config = {'modeBarButtonsToAdd':[
             'drawclosedpath',
             'eraseshape'
         ]}
     ),
     dcc.Store(
-        id = 'figure-store',
-        data = fig
+        id = 'colorscale-base',
+        data = cscale_buffer
     ),
     dcc.Store(
         id = 'colorscale',
@@ -165,11 +167,22 @@ app.layout = html.Div([
         max = 4.0,
         value = 1.0
     ),
-    html.Button("Animation",
-        id = "animate-button",
-        style = {"color":"DarkBlue",
-                 "backgroundColor":"goldenrod",
-                 "height":60},
+    # the movie, one frame at a time fetched from the server as it plays
+    playback_layout('movie', len(images), '/frames', movie_transform(1.0, (0, 255)),
+                    height=height),
+    'Position Angle',
+    dcc.Slider(
+        id = "pa-slider",
+        min = 0,
+        max = 359,
+        step = 1,
+        value = 90,
+        marks = None,
+        tooltip = {"placement": "bottom"},
+    ),
+    dcc.Graph(
+        id='jmap-graph',
+        config = {"displayModeBar": False},
     ),
     html.Hr(),
     html.Details([
@@ -180,127 +193,102 @@ app.layout = html.Div([
     ])
 ], style={"font-size":30})
 
-@app.callback(
+# gamma is folded into the color table in the browser: only the 256
+# entry colorscale changes, the image data never leaves the page
+app.clientside_callback(
+    """
+    function(gamma, base) {
+        return base.map((c, i) => [c[0], base[Math.floor(255*Math.pow(i/255, 1.0/gamma))][1]]);
+    }
+    """,
     Output("colorscale", "data"),
     Input("gamma-slider","value"),
-    State("colorscale","data")
+    State("colorscale-base","data")
 )
-def update_colorscale(gamma, newcs):
-    newidx = (255*np.power(nidx,(1.0/gamma))).astype(np.uint8)
-    for i in np.arange(len(newcs)):
-        newcs[i][1] = cscale_lasco[newidx[i]][1]
-    return newcs
 
-@app.callback(
+app.clientside_callback(
+    """
+    function(rng) {
+        return [rng[0], rng[1]];
+    }
+    """,
     Output("color-range","data"),
     Input("range-slider","value")
 )
-def update_color_range(rng):
-    return (rng[0],rng[1])
-
-@app.callback(
-    Output("figure-store", "data"),
-    Input("colorscale","data"),
-    State("figure-store","data")
-)
-def update_colorscale(newcs, figure):
-    figure["layout"]["coloraxis"]["colorscale"] = newcs
-    return figure
 
+# merge the colorscale and range into the figure already on the page
 app.clientside_callback(
     """
-    function(rng, figure) {
-        if(figure === undefined) {
-            return {'data': [], 'layout': {}};
+    function(rng, cscale, figure) {
+        if(figure === undefined || figure === null) {
+            return window.dash_clientside.no_update;
         }
-        const fig = Object.assign({}, figure, {
+        return Object.assign({}, figure, {
             'layout': {
                 ...figure.layout,
                 'coloraxis': {
                     ...figure.layout.coloraxis,
+                    colorscale: cscale,
                     cmin: rng[0], cmax: rng[1]
                 }
             }
         });
-        return fig;
     }
     """,
     Output('graph', 'figure'),
     Input('color-range', 'data'),
-    Input('figure-store', 'data')
+    Input('colorscale', 'data'),
+    State('graph', 'figure')
 )
 
+register_playback(app, 'movie', len(images), '/frames')
+
+# only the display settings go to the browser, the frame urls follow
 @app.callback(
-    Output('graph','figure'),
-    Input('animate-button','n_clicks'),
+    Output('movie-transform','data'),
+    Input('gamma-slider','value'),
+    Input('color-range','data')
+)
+def update_movie(gamma, rng):
+    return transform_query(movie_transform(gamma, rng))
+
+@app.callback(
+    Output('jmap-graph','figure'),
+    Input('pa-slider','value'),
     State('colorscale','data'),
     State('color-range','data')
 )
-def make_movie(nclicks,cscale,rng):
-
-    rgbmap = plotly_to_rgb(cscale)
-
-    for idx, val in np.ndenumerate(images):
-        rgbimages[idx[0],idx[1],idx[2],:] = rgbmap[val,:]
-
-    fig = px.imshow(rgbimages, animation_frame=0,
-                binary_string = True,
-                labels={"animation_frame":"frame"},
-                height=600,
-                zmin = rng[0],
-                zmax = rng[1]
-                )
-
-    fig.update_traces({
-        "showscale": False,
-        "hovertemplate": 'x: %{x}<br>y: %{y}<br>value: %{z}<extra></extra>',
-        },
-        selector = {'type':'heatmap'}
-    )
-
-    fig.update_layout(transition = {'duration': 0})
-    fig.layout.updatemenus[0].buttons[0].args[1]['frame']['duration'] = 0
-    fig.layout.updatemenus[0].buttons[0].args[1]['transition']['duration'] = 0
+def show_jmap(pa, cscale, rng):
+    # height along the slice against frame number, in the movie's colors
+    if jmaps is None:
+        return {'data': [], 'layout': {}}
 
+    fig = px.imshow(jmaps[int(pa)].T, origin='lower', aspect='auto',
+                    labels={'x': 'frame', 'y': 'height (pixels)'})
     fig.update_layout({
-        "xaxis": {
-            "scaleanchor":"y",
-            "showticklabels": False,
-            "visible": False,
-        },
-        "yaxis": {
-            "visible": False
-        },
-        "showlegend": False,
+        "coloraxis": {'colorscale': cscale, 'cmin': rng[0], 'cmax': rng[1],
+                      'showscale': False},
+        "height": height,
         "paper_bgcolor": "black",
         "plot_bgcolor": "black",
+        "font": {"color": "goldenrod"},
     })
-
-    reverse_button = {
-        'args': [None, {'frame': {'duration': 0, 'redraw': True}, 'mode': 'immediate',
-                 'fromcurrent': True, 'direction': 'reverse',
-                 'transition': {'duration': 0, 'easing': 'linear'}}],
-        'label': '&#9664;',
-        'method': 'animate'
-    }
-    fig.layout.updatemenus[0].buttons = (
-        fig.layout.updatemenus[0].buttons[0],
-        reverse_button,
-        fig.layout.updatemenus[0].buttons[1],
-        )
-
     return fig
 
-@app.callback(
+# the layout is dumped in the browser, the figure is not sent back
+app.clientside_callback(
+    """
+    function(figure) {
+        return '```\\n' + JSON.stringify(figure.layout, null, 2) + '\\n```';
+    }
+    """,
     Output('figure-contents', 'children'),
     Input('graph', 'figure')
 )
-def print_figure_contents(data):
-#    return '```\n'+json.dumps(data, indent=2)+'\n```'
-    return '```\n'+json.dumps(data["layout"], indent=2)+'\n```'
-#    return '```\n'+json.dumps(data["layout"]["coloraxis"], indent=2)+'\n```'
-#    return '```\n'+json.dumps(data["name"], indent=2)+'\n```'
 
 
+# per-callback timings at /metrics when PYCAT_METRICS is set
+instrument(app)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,67 @@
+"""
+Height-time maps (J-maps) along radial slices.
+
+A J-map stacks the intensity along a radial slice at a fixed position
+angle over all frames, so a CME front shows up as a track whose slope
+is its speed in the plane of the sky.  The sample points of all slices
+are computed once per image geometry (see polar.py for the conventions)
+and every frame is then sampled by one gather for all slices at once,
+several frames at a time.
+"""
+
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from polar import bilinear_map, radial_coordinates
+
+#------------------------------------------------------------------------------
+@lru_cache(maxsize=16)
+def slice_map(shape, pas, nr=None, rmin=0.0, rmax=None, center=None):
+    """
+    Return (index, weight, outside) sampling images of the given (y, x)
+    shape along radial slices at the position angles pas (a tuple, in
+    degrees), see bilinear_map(); the points are ordered (pa, height)
+    """
+    cy, cx, r = radial_coordinates(shape, nr, rmin, rmax, center)
+    pa = np.radians(np.asarray(pas, dtype=float))
+    y = cy + np.cos(pa)[:, None]*r
+    x = cx - np.sin(pa)[:, None]*r
+    return bilinear_map(shape, y, x)
+
+def jmap(cube, pas=tuple(range(360)), nr=None, rmin=0.0, rmax=None, center=None,
+         nframes=16, nworkers=None):
+    """
+    Return the (pa, time, height) J-maps of a (time, y, x) cube along the
+    position angles pas (degrees), as float32.  Heights are as for
+    polar_map().  Frames are sampled nframes at a time, by nworkers
+    threads if given (0 means one per core).
+    """
+    pas = tuple(float(p) for p in np.atleast_1d(pas))
+    shape = tuple(cube.shape[1:])
+    index, weight, outside = slice_map(shape, pas, nr, rmin, rmax, center)
+
+    npa = len(pas)
+    nheights = outside.size // npa
+    out = np.empty((npa, len(cube), nheights), dtype=np.float32)
+
+    def work(k0):
+        k1 = min(k0 + nframes, len(cube))
+        block = np.asarray(cube[k0:k1]).reshape(k1 - k0, -1)
+        values = np.take(block, index, axis=1) * weight
+        result = values.sum(axis=1)
+        result[:, outside] = np.nan
+        out[:, k0:k1] = result.reshape(k1 - k0, npa, nheights).transpose(1, 0, 2)
+
+    starts = range(0, len(cube), nframes)
+    if nworkers is None or nworkers == 1:
+        for k0 in starts:
+            work(k0)
+    else:
+        with ThreadPoolExecutor(max_workers=nworkers or os.cpu_count()) as pool:
+            list(pool.map(work, starts))
+
+    return out
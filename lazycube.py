@@ -0,0 +1,67 @@
+"""
+Base class for cubes whose frames are computed on demand.
+
+Processing stages (differences, filters, remaps) wrap another cube and
+produce one output frame at a time, so they can be chained and fed to
+the statistics and uint8 scaling without ever stacking the sequence.
+Subclasses set shape and dtype and implement frame(k, out=None); this
+gives them (and FitsCube) numpy-style indexing.
+"""
+
+import numpy as np
+
+#------------------------------------------------------------------------------
+class LazyCube:
+    """A (time, y, x) cube indexed like a numpy array, see the module docstring"""
+
+    shape = ()
+    dtype = np.dtype(np.float32)
+
+    def frame(self, k, out=None):
+        raise NotImplementedError
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self.frame(k)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        k, rest = key[0], key[1:]
+
+        if isinstance(k, (int, np.integer)):
+            return self.frame(k)[rest]
+
+        idx = np.arange(len(self))[k]
+        if not rest:
+            out = np.empty((len(idx),) + self.shape[1:], dtype=self.dtype)
+            for n, i in enumerate(idx):
+                self.frame(i, out=out[n])
+            return out
+
+        # the shape of a frame indexed by rest, without allocating one
+        shape = np.broadcast_to(np.empty((), dtype=bool), self.shape[1:])[rest].shape
+        out = np.empty((len(idx),) + shape, dtype=self.dtype)
+        for n, i in enumerate(idx):
+            out[n] = self.frame(i)[rest]
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[:]
+        if dtype is not None:
+            out = out.astype(dtype, copy=False)
+        return out
+
+    def __repr__(self):
+        return f"{type(self).__name__}(shape={self.shape}, dtype={self.dtype})"
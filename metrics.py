@@ -0,0 +1,151 @@
+"""
+Timing and payload size instrumentation for the Dash apps and Flask servers.
+
+instrument(app) wraps every Flask view function of an app (a Dash app or
+a plain Flask server) so that each request records its wall time, the
+size of the request body and the size of the serialized response.  Dash
+callbacks all go through the single _dash-update-component route, so
+those requests are labelled with the name of the callback function
+instead.  The observations are aggregated into histograms that are
+served in the Prometheus text format at /metrics.
+
+Nothing is wrapped unless PYCAT_METRICS is set in the environment (or
+enabled=True is passed), so a disabled app runs exactly the code it
+would run without this module.  Call instrument() once, after all
+callbacks and routes are registered:
+
+    instrument(app)
+    app.run_server()
+"""
+
+import os
+import threading
+import time
+
+from bisect import bisect_left
+from functools import wraps
+
+from flask import Response, request
+
+METRICS_ENABLED = os.environ.get('PYCAT_METRICS', '') not in ('', '0')
+
+# upper bucket bounds: seconds, and 256 B to 64 MB in factors of 4
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = tuple(256 * 4**n for n in range(10))
+
+METRICS = {
+    'pycat_request_seconds': ('Wall time of requests and callbacks', LATENCY_BUCKETS),
+    'pycat_request_bytes': ('Size of the request body (callback inputs)', BYTES_BUCKETS),
+    'pycat_response_bytes': ('Size of the serialized response', BYTES_BUCKETS),
+}
+
+#------------------------------------------------------------------------------
+class Histogram:
+    """Cumulative histogram with fixed upper bucket bounds"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        total = 0
+        for le, n in zip(self.buckets + ('+Inf',), self.counts):
+            total += n
+            yield f'{name}_bucket{{{labels},le="{le}"}} {total}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+class Registry:
+    """Thread-safe histograms keyed on (metric, kind, name)"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, kind, name, seconds, nin, nout):
+        with self._lock:
+            for metric, value in zip(METRICS, (seconds, nin, nout)):
+                key = (metric, kind, name)
+                h = self._histograms.get(key)
+                if h is None:
+                    h = self._histograms[key] = Histogram(METRICS[metric][1])
+                h.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def exposition(self):
+        """All histograms in the Prometheus text format"""
+        out = []
+        with self._lock:
+            for metric, (text, _) in METRICS.items():
+                out.append(f'# HELP {metric} {text}')
+                out.append(f'# TYPE {metric} histogram')
+                for (m, kind, name), h in sorted(self._histograms.items()):
+                    if m == metric:
+                        name = name.replace('\\', '\\\\').replace('"', '\\"')
+                        out.extend(h.lines(metric, f'kind="{kind}",name="{name}"'))
+        return '\n'.join(out) + '\n'
+
+REGISTRY = Registry()
+
+#------------------------------------------------------------------------------
+def _callback_name(app):
+    # the callback function behind a _dash-update-component request
+    body = request.get_json(silent=True) or {}
+    output = body.get('output', '')
+    entry = getattr(app, 'callback_map', {}).get(output, {})
+    func = entry.get('callback')
+    return getattr(func, '__name__', output)
+
+def _instrument_view(server, view, kind, name, registry, app=None):
+
+    @wraps(view)
+    def timed(*args, **kwargs):
+        t0 = time.perf_counter()
+        resp = server.make_response(view(*args, **kwargs))
+        seconds = time.perf_counter() - t0
+
+        label = _callback_name(app) if app is not None else name
+        nout = resp.calculate_content_length() or 0
+        registry.observe(kind, label, seconds, request.content_length or 0, nout)
+        return resp
+
+    return timed
+
+def instrument(app, enabled=None, path='/metrics', registry=REGISTRY):
+    """
+    Record timings and payload sizes for all routes (and Dash callbacks)
+    of a Dash app or Flask server and serve them at path.  Does nothing
+    unless enabled, which defaults to METRICS_ENABLED.
+    """
+    if enabled is None:
+        enabled = METRICS_ENABLED
+    if not enabled:
+        return
+
+    server = getattr(app, 'server', app)
+
+    for endpoint, view in list(server.view_functions.items()):
+        if endpoint == 'static':
+            continue
+        if endpoint.endswith('_dash-update-component'):
+            timed = _instrument_view(server, view, 'callback', endpoint, registry, app)
+        else:
+            timed = _instrument_view(server, view, 'route', endpoint, registry)
+        server.view_functions[endpoint] = timed
+
+    def metrics():
+        return Response(registry.exposition(),
+                        mimetype='text/plain; version=0.0.4')
+
+    server.add_url_rule(path, endpoint='pycat_metrics', view_func=metrics)
@@ -0,0 +1,70 @@
+"""
+Animated image figures built from pre-encoded frames.
+
+This produces the same figure as
+
+    px.imshow(rgb, animation_frame=0, binary_string=True)
+
+plus the layout the apps apply on top of it (no transitions, a reverse
+button, hidden axes), but it takes the frames as already encoded data
+URIs, e.g. from a FrameEncoder, so nothing is re-encoded here.
+"""
+
+import plotly.graph_objects as go
+
+#------------------------------------------------------------------------------
+def _animate_args(frame_duration=0):
+    return {'frame': {'duration': frame_duration, 'redraw': True},
+            'mode': 'immediate', 'fromcurrent': True,
+            'transition': {'duration': 0, 'easing': 'linear'}}
+
+def movie_figure(sources, height=800, label="frame"):
+    """Return an animated go.Figure with one go.Image frame per source"""
+    names = [str(k) for k in range(len(sources))]
+
+    frames = [go.Frame(data=[go.Image(source=s, name=n)], name=n)
+              for n, s in zip(names, sources)]
+
+    fig = go.Figure(data=[go.Image(source=sources[0], name=names[0])],
+                    frames=frames)
+
+    play_button = {'args': [None, _animate_args()],
+                   'label': '&#9654;', 'method': 'animate'}
+
+    reverse_button = {'args': [None, dict(_animate_args(), direction='reverse')],
+                      'label': '&#9664;', 'method': 'animate'}
+
+    pause_button = {'args': [[None], _animate_args()],
+                    'label': '&#9724;', 'method': 'animate'}
+
+    steps = [{'args': [[n], _animate_args()], 'label': n, 'method': 'animate'}
+             for n in names]
+
+    fig.update_layout({
+        "updatemenus": [{
+            'buttons': [play_button, reverse_button, pause_button],
+            'direction': 'left', 'pad': {'r': 10, 't': 70},
+            'showactive': False, 'type': 'buttons',
+            'x': 0.1, 'xanchor': 'right', 'y': 0, 'yanchor': 'top'
+        }],
+        "sliders": [{
+            'active': 0, 'currentvalue': {'prefix': label + '='},
+            'len': 0.9, 'pad': {'b': 10, 't': 60}, 'steps': steps,
+            'x': 0.1, 'xanchor': 'left', 'y': 0, 'yanchor': 'top'
+        }],
+        "transition": {'duration': 0},
+        "xaxis": {
+            "scaleanchor": "y",
+            "showticklabels": False,
+            "visible": False,
+        },
+        "yaxis": {
+            "visible": False
+        },
+        "showlegend": False,
+        "height": height,
+        "paper_bgcolor": "black",
+        "plot_bgcolor": "black",
+    })
+
+    return fig
@@ -0,0 +1,226 @@
+"""
+Frame-on-demand movie playback for Dash apps.
+
+Instead of embedding every frame in fig.frames (so that the initial
+payload grows with the length of the movie), the figure holds a single
+image trace whose source is a URL on the app's own Flask server.  A
+slider and play/reverse/pause buttons drive a clientside callback that
+points the trace at the next frame and prefetches a few frames ahead,
+so the browser only ever downloads the frames that are shown and the
+server only encodes them once (they go through a FrameEncoder).
+
+Usage:
+
+    encoder = FrameEncoder(cube)
+    register_frames(app.server, encoder, '/frames')
+    app.layout = html.Div([..., playback_layout('movie', len(cube), '/frames')])
+    register_playback(app, 'movie', len(cube), '/frames')
+
+and, to change the display settings, a callback with
+Output('movie-transform', 'data') returning transform_query(transform).
+"""
+
+import math
+
+from urllib.parse import urlencode
+
+import plotly.graph_objects as go
+
+from dash import dcc, html
+from dash.dependencies import Input, Output, State
+from flask import Response, abort, request
+
+from colortables import COLORMAPS
+from display import DisplayTransform
+from framecache import MIME_TYPES
+
+# accepted ranges of the numbers in a transform query
+QUERY_LIMITS = {
+    'gamma': (0.01, 100.0),
+    'cmin': (0.0, 65535.0),
+    'cmax': (0.0, 65535.0),
+    'top': (1, 65535),
+    'ncolors': (3, 4096),
+}
+
+#------------------------------------------------------------------------------
+def transform_query(t):
+    """Encode a DisplayTransform as a URL query string"""
+    return urlencode({'cmap': t.cmap, 'gamma': t.gamma, 'cmin': t.cmin,
+                      'cmax': t.cmax, 'top': t.top, 'ncolors': t.ncolors})
+
+def transform_from_query(args, default=DisplayTransform()):
+    """
+    Inverse of transform_query, for a Flask request.args.  Raises
+    ValueError for a colormap that is not one of COLORMAPS or a value
+    that is not a finite number; numbers outside QUERY_LIMITS are
+    clamped to them.
+    """
+    cmap = args.get('cmap', default.cmap)
+    if cmap not in COLORMAPS.values():
+        raise ValueError(f"unknown colormap {cmap!r}")
+
+    values = {}
+    for name, (lo, hi) in QUERY_LIMITS.items():
+        value = float(args.get(name, getattr(default, name)))
+        if not math.isfinite(value):
+            raise ValueError(f"{name} must be finite, not {value}")
+        values[name] = type(lo)(min(max(value, lo), hi))
+
+    return DisplayTransform(cmap=cmap, **values)
+
+def frame_url(prefix, k, t, codec='png'):
+    return f"{prefix}/{k}.{codec}?{transform_query(t)}"
+
+#------------------------------------------------------------------------------
+def register_frames(server, encoder, prefix='/frames', max_age=3600):
+    """
+    Serve the frames of a FrameEncoder from a Flask server at
+    prefix/<k>.png (or .jpg), with the display transform in the query
+    string.  The responses may be cached by the browser for max_age s.
+    An invalid transform gives a 400 response.
+    """
+
+    def frame(k, codec):
+        if codec not in MIME_TYPES or not 0 <= k < len(encoder):
+            abort(404)
+        try:
+            t = transform_from_query(request.args)
+        except ValueError:
+            abort(400)
+        resp = Response(encoder.encode(k, t, codec), mimetype=MIME_TYPES[codec])
+        resp.cache_control.max_age = max_age
+        resp.cache_control.public = True
+        return resp
+
+    server.add_url_rule(f"{prefix}/<int:k>.<codec>", endpoint=f"frames{prefix}",
+                        view_func=frame)
+
+#------------------------------------------------------------------------------
+def playback_figure(source, height=800):
+    """A figure with a single image trace, styled like the movie figures"""
+    fig = go.Figure(go.Image(source=source))
+    fig.update_layout({
+        "xaxis": {
+            "scaleanchor": "y",
+            "showticklabels": False,
+            "visible": False,
+        },
+        "yaxis": {
+            "visible": False
+        },
+        "showlegend": False,
+        "height": height,
+        "margin": {'t': 10, 'b': 10, 'l': 10, 'r': 10},
+        "paper_bgcolor": "black",
+        "plot_bgcolor": "black",
+        # keep zoom and pan while the frames change
+        "uirevision": "playback",
+    })
+    return fig
+
+def playback_layout(id, nframes, prefix='/frames', transform=DisplayTransform(),
+                    height=800, interval=100):
+    """
+    Components for a frame-on-demand movie: the graph (id), a frame
+    slider, play/reverse/pause buttons, the playback clock and a store
+    (id-transform) holding the current display transform as a query.
+    interval is the time between frames in ms.
+    """
+    button_style = {"color": "DarkBlue", "backgroundColor": "goldenrod"}
+
+    return html.Div([
+        dcc.Graph(
+            id = id,
+            figure = playback_figure(frame_url(prefix, 0, transform), height),
+            config = {"displayModeBar": False},
+        ),
+        html.Div([
+            html.Button('◀', id=f"{id}-reverse", style=button_style),
+            html.Button('◼', id=f"{id}-pause", style=button_style),
+            html.Button('▶', id=f"{id}-play", style=button_style),
+        ]),
+        dcc.Slider(
+            id = f"{id}-frame",
+            min = 0,
+            max = nframes - 1,
+            step = 1,
+            value = 0,
+            marks = None,
+            tooltip = {"placement": "bottom"},
+        ),
+        dcc.Interval(
+            id = f"{id}-clock",
+            interval = interval,
+            disabled = True,
+        ),
+        dcc.Store(id=f"{id}-direction", data=1),
+        dcc.Store(id=f"{id}-transform", data=transform_query(transform)),
+    ])
+
+def register_playback(app, id, nframes, prefix='/frames', prefetch=4, codec='png'):
+    """
+    Wire up the components of playback_layout(id, ...) with clientside
+    callbacks; prefetch is the number of frames requested ahead of the
+    one that is shown.
+    """
+
+    # play, reverse and pause set the direction and start/stop the clock
+    app.clientside_callback(
+        f"""
+        function(play, reverse, pause) {{
+            const ctx = window.dash_clientside.callback_context;
+            const trigger = ctx.triggered.length ? ctx.triggered[0].prop_id : '';
+            if (trigger.startsWith('{id}-play')) {{
+                return [false, 1];
+            }}
+            if (trigger.startsWith('{id}-reverse')) {{
+                return [false, -1];
+            }}
+            return [true, window.dash_clientside.no_update];
+        }}
+        """,
+        Output(f"{id}-clock", 'disabled'),
+        Output(f"{id}-direction", 'data'),
+        Input(f"{id}-play", 'n_clicks'),
+        Input(f"{id}-reverse", 'n_clicks'),
+        Input(f"{id}-pause", 'n_clicks'),
+        prevent_initial_call=True,
+    )
+
+    # every tick of the clock advances the slider
+    app.clientside_callback(
+        f"""
+        function(n, direction, k) {{
+            return (k + direction + {nframes}) % {nframes};
+        }}
+        """,
+        Output(f"{id}-frame", 'value'),
+        Input(f"{id}-clock", 'n_intervals'),
+        State(f"{id}-direction", 'data'),
+        State(f"{id}-frame", 'value'),
+        prevent_initial_call=True,
+    )
+
+    # the slider (or a new transform) points the image at a frame url
+    app.clientside_callback(
+        f"""
+        function(k, query, direction, figure) {{
+            if (figure === undefined || k === undefined) {{
+                return window.dash_clientside.no_update;
+            }}
+            const url = (j) => '{prefix}/' + j + '.{codec}?' + query;
+            for (let i = 1; i <= {prefetch}; i++) {{
+                const j = (k + i*direction + {nframes}) % {nframes};
+                (new Image()).src = url(j);
+            }}
+            const image = Object.assign({{}}, figure.data[0], {{'source': url(k)}});
+            return Object.assign({{}}, figure, {{'data': [image]}});
+        }}
+        """,
+        Output(id, 'figure'),
+        Input(f"{id}-frame", 'value'),
+        Input(f"{id}-transform", 'data'),
+        State(f"{id}-direction", 'data'),
+        State(id, 'figure'),
+    )
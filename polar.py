@@ -0,0 +1,133 @@
+"""
+Remap coronagraph images from cartesian to polar (height, position angle).
+
+A polar image has one column per position angle and one row per height
+(distance from the center in pixels), so a CME travelling radially
+moves straight up its columns.  Position angle follows radial.py: it is
+measured counterclockwise from up, with rows increasing upwards as in
+FITS data.
+
+Every output pixel is a bilinear interpolation of four input pixels.
+Their flat indices and weights depend only on the image shape and the
+polar grid, so they are computed once and cached; remapping a frame is
+then a single np.take gather and a weighted sum.
+"""
+
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from lazycube import LazyCube
+
+#------------------------------------------------------------------------------
+@lru_cache(maxsize=16)
+def polar_map(shape, npa=360, nr=None, rmin=0.0, rmax=None, center=None):
+    """
+    Return (index, weight, outside) for remapping images of the given
+    (y, x) shape onto an (nr, npa) polar grid.  index and weight are
+    read-only (4, nr*npa) arrays of input pixels and their bilinear
+    weights; outside flags the output pixels that fall off the image.
+    Heights run from rmin to rmax pixels (default: the largest circle
+    that fits in the image), in nr steps (default: one per pixel).
+    """
+    cy, cx, r = radial_coordinates(shape, nr, rmin, rmax, center)
+    pa = np.arange(npa) * (2*np.pi/npa)
+    y = cy + r[:, None]*np.cos(pa)
+    x = cx - r[:, None]*np.sin(pa)
+
+    return bilinear_map(shape, y, x)
+
+def bilinear_map(shape, y, x):
+    """
+    Return read-only (index, weight, outside) for sampling images of the
+    given (y, x) shape at the points y, x (any shape, flattened): the
+    flat indices of the four neighbours, their weights, and a mask of
+    the points that fall off the image
+    """
+    ny, nx = shape
+    outside = ((y < 0) | (y > ny - 1) | (x < 0) | (x > nx - 1)).ravel()
+
+    y0 = np.clip(np.floor(y), 0, ny - 2).astype(np.intp).ravel()
+    x0 = np.clip(np.floor(x), 0, nx - 2).astype(np.intp).ravel()
+    fy = np.clip(y.ravel() - y0, 0, 1)
+    fx = np.clip(x.ravel() - x0, 0, 1)
+
+    i00 = y0*nx + x0
+    index = np.stack([i00, i00 + 1, i00 + nx, i00 + nx + 1])
+    weight = np.stack([(1 - fy)*(1 - fx), (1 - fy)*fx,
+                       fy*(1 - fx), fy*fx]).astype(np.float32)
+
+    for a in (index, weight, outside):
+        a.flags.writeable = False
+    return index, weight, outside
+
+def radial_coordinates(shape, nr=None, rmin=0.0, rmax=None, center=None):
+    """
+    Return (cy, cx, r): the center and the nr heights of a polar grid,
+    with the defaults of polar_map()
+    """
+    ny, nx = shape
+    if center is None:
+        center = ((ny - 1)/2, (nx - 1)/2)
+    cy, cx = center
+    if rmax is None:
+        rmax = min(cy, cx, ny - 1 - cy, nx - 1 - cx)
+    if nr is None:
+        nr = int(np.ceil(rmax - rmin)) + 1
+    return cy, cx, np.linspace(rmin, rmax, nr)
+
+def to_polar(frame, npa=360, nr=None, rmin=0.0, rmax=None, center=None, out=None):
+    """Return the (nr, npa) polar image of a frame, see polar_map()"""
+    frame = np.asarray(frame)
+    index, weight, outside = polar_map(frame.shape, npa, nr, rmin, rmax, center)
+
+    # out of place, so that integer frames come out as floats
+    values = np.take(frame.reshape(-1), index) * weight
+    result = values.sum(axis=0)
+    result[outside] = np.nan
+
+    shape = (result.size // npa, npa)
+    if out is None:
+        return result.reshape(shape)
+    out[...] = result.reshape(shape)
+    return out
+
+#------------------------------------------------------------------------------
+class PolarCube(LazyCube):
+    """A lazy (time, nr, npa) cube of the polar images of another cube"""
+
+    def __init__(self, cube, npa=360, nr=None, rmin=0.0, rmax=None, center=None):
+        self.cube = cube
+        self.grid = (npa, nr, rmin, rmax, None if center is None else tuple(center))
+        index, weight, outside = polar_map(tuple(cube.shape[1:]), *self.grid)
+        self.shape = (len(cube), outside.size // npa, npa)
+        self.dtype = np.result_type(np.dtype(cube.dtype).newbyteorder('='), np.float32)
+
+    def frame(self, k, out=None):
+        """Return polar image k, written into out if given"""
+        k = range(len(self))[k]
+        return to_polar(self.cube[k], *self.grid, out=out)
+
+def polar_sequence(cube, npa=360, nr=None, rmin=0.0, rmax=None, center=None,
+                   nworkers=None):
+    """
+    Remap every frame of a cube and return the stacked (time, nr, npa)
+    polar cube, using nworkers threads if given (0 means one per core)
+    """
+    polar = PolarCube(cube, npa, nr, rmin, rmax, center)
+    out = np.empty(polar.shape, dtype=polar.dtype)
+
+    def work(k):
+        polar.frame(k, out=out[k])
+
+    if nworkers is None or nworkers == 1:
+        for k in range(len(polar)):
+            work(k)
+    else:
+        with ThreadPoolExecutor(max_workers=nworkers or os.cpu_count()) as pool:
+            list(pool.map(work, range(len(polar))))
+
+    return out
@@ -7,6 +7,9 @@ import matplotlib.pyplot as plt
 
 from scipy.spatial import ConvexHull
 
+from conegeom import unit_profile
+from coneproj import outline
+
 #-----------------------------------
 # create base cone
 
@@ -15,15 +18,7 @@ Nr = 200
 
 twopi = 2.0 * np.pi
 
-z = np.linspace(0.0,1.0,num=Nz)
-
-alpha = z*z
-b = 2.0*alpha + 1.0
-c = alpha*(alpha - 1.0)
-
-beta = (- b + np.sqrt(b*b - 4.0*c))/2.0
-
-r = np.sqrt(beta)
+z, r = unit_profile('quartic', Nz)
 rnorm = r / max(r)
 
 # compute number of radial points for each z
@@ -81,8 +76,9 @@ yprime = ct*sp*x0 + cp*y0 + st*sp*z0
 zprime = ct*z0 - st*x0
 
 #-----------------------------------
-# two plot options: set to 1 for line plot or 2 for contour plot
-ptype = 3
+# plot options: set to 1 for line plot, 2 for contour plot, 3 for the
+# convex hull of the points or 4 for the analytic outline
+ptype = 4
 
 if ptype == 1:
 
@@ -137,6 +133,16 @@ elif ptype == 2:
                 coloring = "lines"
             )))
     fig.show()
+elif ptype == 4:
+
+    # computed directly from the cone parameters, fast enough for sliders
+    edge = outline(latitude, longitude, psi, a, nvertices=200)
+    edge = np.vstack([edge, edge[:1]])
+
+    fig = go.Figure(go.Scatter(x=edge[:,0], y=edge[:,1],
+        mode='lines', line = {'color':'blue'}))
+    fig.update_yaxes(scaleanchor='x')
+    fig.show()
 else:
 
     points = np.zeros((Npoints,2))
@@ -0,0 +1,84 @@
+"""
+Multi-resolution image pyramids.
+
+Every level halves the resolution of the one before it: level 0 is the
+full frame, level 1 is 1/2, level 2 is 1/4 and so on.  The reduction is
+done by reshaping the frame into (ny, nx, factor*factor) blocks and
+reducing over the last axis, which is fully vectorized (unlike
+skimage.measure.block_reduce with np.nanmedian, which calls the median
+once per block).  NaNs are ignored; blocks without any finite value
+reduce to NaN.
+"""
+
+import math
+
+import numpy as np
+
+REDUCERS = ('median', 'mean')
+
+#------------------------------------------------------------------------------
+def _blocks(frame, factor):
+    # (ny, nx, factor*factor) view of the blocks, NaN padded at the edges
+    frame = np.asarray(frame)
+    frame = frame.astype(np.result_type(frame.dtype.newbyteorder('='), np.float32),
+                         copy=False)
+    ny = -(-frame.shape[0] // factor)
+    nx = -(-frame.shape[1] // factor)
+    pady = ny*factor - frame.shape[0]
+    padx = nx*factor - frame.shape[1]
+    if pady or padx:
+        frame = np.pad(frame, ((0, pady), (0, padx)), constant_values=np.nan)
+    blocks = frame.reshape(ny, factor, nx, factor).swapaxes(1, 2)
+    return blocks.reshape(ny, nx, factor*factor)
+
+def reduce_frame(frame, factor=2, method='median'):
+    """
+    Downsample a 2d frame by factor in both directions, with the NaN
+    ignoring median or mean of every factor x factor block
+    """
+    if method not in REDUCERS:
+        raise ValueError(f"unknown reduction {method!r}, use one of {REDUCERS}")
+
+    blocks = _blocks(frame, factor)
+    good = np.isfinite(blocks)
+    n = good.sum(axis=-1)
+
+    if method == 'mean':
+        total = np.where(good, blocks, 0).sum(axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(n > 0, total/n, np.nan).astype(blocks.dtype)
+
+    # NaNs sort to the end (but -inf to the start), so with every
+    # non-finite value made NaN the finite values of a block come first
+    # and its median is the mean of the middle one or two of those
+    s = np.sort(np.where(good, blocks, np.nan), axis=-1)
+    lo = np.take_along_axis(s, np.maximum(n - 1, 0)[..., None] // 2, axis=-1)
+    hi = np.take_along_axis(s, n[..., None] // 2, axis=-1)
+    return np.where(n > 0, 0.5*(lo[..., 0] + hi[..., 0]), np.nan).astype(blocks.dtype)
+
+def build_pyramid(frame, nlevels=4, method='median'):
+    """
+    Return the list [frame, 1/2, 1/4, ...] of nlevels resolutions of a
+    frame, each level reduced from the one before it
+    """
+    levels = [np.asarray(frame)]
+    for n in range(1, nlevels):
+        levels.append(reduce_frame(levels[-1], 2, method))
+    return levels
+
+#------------------------------------------------------------------------------
+def level_shape(shape, level):
+    """Frame shape (y, x) at a pyramid level"""
+    f = 2**level
+    return tuple(-(-n // f) for n in shape)
+
+def pick_level(shape, display_size, nlevels):
+    """
+    The pyramid level whose resolution best matches display_size pixels
+    along the larger axis of a frame of the given (full resolution)
+    shape, so no more pixels are shipped than the browser can show
+    """
+    ratio = max(shape) / max(display_size, 1)
+    if ratio <= 1:
+        return 0
+    return min(int(round(math.log2(ratio))), nlevels - 1)
@@ -0,0 +1,51 @@
+"""
+Scale an image cube to 8-bit color indices, one frame at a time.
+
+Working frame by frame means the floating point cube never has to be
+stacked in memory: only one frame of temporaries exists at any time and
+the uint8 result is written straight into its (preallocated) output.
+The clip levels come from the streaming histograms in stats.py, so they
+can be robust percentiles rather than the raw min and max.
+"""
+
+import numpy as np
+
+from stats import sequence_histogram
+
+#------------------------------------------------------------------------------
+def data_range(cube, lower=0.0, upper=100.0, per_frame=False, nworkers=None):
+    """
+    Clip levels (vmin, vmax) of a cube at the lower and upper percentile
+    of its finite values, computed in one pass over the frames.  The
+    defaults give the (NaN-ignoring) min and max.  With per_frame the
+    levels are arrays with one value per frame.
+    """
+    hist = sequence_histogram(cube, nworkers=nworkers)
+    return hist.clip_levels(lower, upper, per_frame=per_frame)
+
+def scale_to_uint8(cube, vmin, vmax, top=254, gamma=1.0, out=None):
+    """
+    Return top*((cube - vmin)/(vmax - vmin))**gamma as uint8, clipped to
+    [0, top], with non-finite pixels (NaN and +-inf) set to 0.  vmin and
+    vmax are scalars or arrays with one value per frame.
+
+    If out is given it must be a uint8 array of the same shape as cube;
+    it is filled in place and returned.
+    """
+    if out is None:
+        out = np.empty(cube.shape, dtype=np.uint8)
+
+    vmin = np.broadcast_to(vmin, (len(cube),))
+    vmax = np.broadcast_to(vmax, (len(cube),))
+
+    for k in range(len(cube)):
+        norm = 1.0/(vmax[k] - vmin[k])
+        buf = norm*(cube[k] - vmin[k])
+        np.nan_to_num(buf, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        np.clip(buf, 0.0, 1.0, out=buf)
+        if gamma != 1.0:
+            np.power(buf, gamma, out=buf)
+        buf *= top
+        np.copyto(out[k], buf, casting='unsafe')
+
+    return out
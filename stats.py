@@ -0,0 +1,152 @@
+"""
+Streaming intensity statistics for image sequences.
+
+Each frame is reduced to a histogram in a single pass over the sequence,
+one frame at a time, so sequences that do not fit in memory are fine.
+Global or per-frame percentiles (and hence robust clip levels for the
+uint8 scaling) are then derived from the histograms alone: NaNs and a
+few hot pixels no longer decide the contrast of the whole movie.
+
+The bins do not depend on the data.  Values are binned on the top 16
+bits of their (order preserving) float32 representation, i.e. by sign,
+exponent and 7 bits of mantissa, which gives bins about 0.8% wide
+relative to the value over the whole float range.  The histograms of
+different frames therefore simply add up, and an outlier cannot stretch
+the bins of the rest of the data.
+"""
+
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+NBINS = 65536
+
+#------------------------------------------------------------------------------
+def _keys(values):
+    # order preserving map of finite float32 values to 16 bit bin numbers
+    u = np.ascontiguousarray(values, dtype=np.float32).view(np.uint32)
+    neg = (u >> 31).astype(bool)
+    u = np.where(neg, ~u, u | np.uint32(0x80000000))
+    return (u >> 16).astype(np.intp)
+
+@lru_cache(maxsize=None)
+def _edges():
+    # value at the lower edge of every bin, plus the upper edge of the
+    # last one (bins of inf and nan bit patterns never hold finite values)
+    u = np.arange(NBINS, dtype=np.uint32) << np.uint32(16)
+    bits = np.where(u >> 31 == 1, u & np.uint32(0x7fffffff), ~u)
+    with np.errstate(invalid='ignore'):
+        edges = np.append(bits.view(np.float32).astype(float), np.inf)
+    edges.flags.writeable = False
+    return edges
+
+def _percentile(counts, offset, lo, hi, q):
+    # q-th percentile from counts over bins offset, offset+1, ...
+    total = counts.sum()
+    if total == 0:
+        return np.nan
+    if q <= 0:
+        return lo
+    if q >= 100:
+        return hi
+
+    c = np.cumsum(counts)
+    target = q/100.0 * total
+    i = min(int(np.searchsorted(c, target)), len(c)-1)
+    below = c[i] - counts[i]
+    frac = (target - below)/counts[i]
+
+    edges = _edges()
+    e0 = max(edges[offset+i], lo)
+    e1 = min(edges[offset+i+1], hi)
+    return e0 + frac*(e1 - e0)
+
+#------------------------------------------------------------------------------
+def frame_histogram(frame):
+    """
+    Return (lo, hi, offset, counts, nbad) for one frame: the finite
+    range, the counts of finite values in bins offset, offset+1, ...
+    (trimmed to the occupied bins) and the number of non-finite pixels.
+    """
+    frame = np.asarray(frame)
+    good = np.isfinite(frame)
+    values = frame[good]
+    nbad = frame.size - values.size
+
+    if values.size == 0:
+        return np.nan, np.nan, 0, np.zeros(0, dtype=np.int64), nbad
+
+    keys = _keys(values)
+    offset = int(keys.min())
+    counts = np.bincount(keys - offset)
+
+    return float(values.min()), float(values.max()), offset, counts, nbad
+
+#------------------------------------------------------------------------------
+class SequenceHistogram:
+    """
+    Per-frame histograms of a (time, y, x) sequence, see
+    sequence_histogram().  lo, hi and nbad are arrays over frames.
+    """
+
+    def __init__(self, frames):
+        lo, hi, self.offsets, self.counts, nbad = zip(*frames)
+        self.lo = np.array(lo, dtype=float)
+        self.hi = np.array(hi, dtype=float)
+        self.nbad = np.array(nbad)
+
+        # the histogram of the whole sequence
+        self.total = np.zeros(NBINS, dtype=np.int64)
+        for offset, counts in zip(self.offsets, self.counts):
+            self.total[offset:offset+len(counts)] += counts
+
+    @property
+    def nframes(self):
+        return len(self.lo)
+
+    def percentile(self, q, frame=None):
+        """
+        q-th percentile (0 to 100) of the finite pixels, either over the
+        whole sequence or of a single frame
+        """
+        if frame is not None:
+            return _percentile(self.counts[frame], self.offsets[frame],
+                               self.lo[frame], self.hi[frame], q)
+        return _percentile(self.total, 0, np.nanmin(self.lo), np.nanmax(self.hi), q)
+
+    def clip_levels(self, lower=0.0, upper=100.0, per_frame=False):
+        """
+        Return (vmin, vmax) at the given percentiles, as scalars for the
+        whole sequence or as arrays over frames if per_frame is True.
+        The defaults give the exact range of the finite data.
+        """
+        if per_frame:
+            vmin = np.array([self.percentile(lower, k) for k in range(self.nframes)])
+            vmax = np.array([self.percentile(upper, k) for k in range(self.nframes)])
+            return vmin, vmax
+        return self.percentile(lower), self.percentile(upper)
+
+#------------------------------------------------------------------------------
+def sequence_histogram(cube, nworkers=None, out=None):
+    """
+    Accumulate per-frame histograms over a (time, y, x) cube in one
+    pass.  Frames are processed one at a time, or by nworkers threads
+    if given (0 means one per core).  If out is given the frames are
+    also stored in it, so a lazy cube is computed only once.
+    """
+    def work(k):
+        frame = cube[k]
+        if out is not None:
+            out[k] = frame
+        return frame_histogram(frame)
+
+    if nworkers is None or nworkers == 1:
+        frames = [work(k) for k in range(len(cube))]
+    else:
+        with ThreadPoolExecutor(max_workers=nworkers or os.cpu_count()) as pool:
+            frames = list(pool.map(work, range(len(cube))))
+
+    return SequenceHistogram(frames)
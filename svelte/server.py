@@ -1,8 +1,50 @@
-from flask import Flask, send_from_directory, request
+from flask import Flask, send_from_directory, request, abort, jsonify, Response
+from functools import lru_cache
+import glob
+import os
 import random
+import sys
+
+# the image pipeline lives in the top level of the repo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from colortables import rgb_table  # noqa: E402
+from cubecache import scaled_sequence  # noqa: E402
+from metrics import instrument  # noqa: E402
+from tiles import TILE_SIZE  # noqa: E402
 
 app = Flask(__name__)
 
+# directory with the FITS sequence served by the /frames routes
+datadir = os.environ.get('PYCAT_DATA', '../data')
+
+#------------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def sequence():
+    # the quantized cube is memory-mapped from the cache, loaded on first use
+    files = sorted(os.path.basename(f) for f in glob.glob(os.path.join(datadir, '*.fts')))
+    if len(files) == 0:
+        abort(404)
+    arrays, meta = scaled_sequence(datadir, files, top=254, levels=4)
+    return arrays, meta
+
+def level_cube():
+    # the cube at the pyramid level given by ?level=n (0 is full resolution)
+    arrays, meta = sequence()
+    level = request.args.get('level', 0, type=int)
+    if not 0 <= level < meta['levels']:
+        abort(404)
+    return arrays[f'level{level}'] if level > 0 else arrays['cube']
+
+def binary_response(a):
+    # raw array bytes, so the client can colorize them itself
+    resp = Response(a.tobytes(), mimetype='application/octet-stream')
+    resp.headers['X-Shape'] = ','.join(str(n) for n in a.shape)
+    resp.headers['X-Dtype'] = str(a.dtype)
+    resp.cache_control.max_age = 3600
+    return resp
+
+#------------------------------------------------------------------------------
 @app.route("/")
 def base():
     return send_from_directory('client/public', 'index.html')
@@ -21,6 +63,62 @@ def generate_random():
     print(args['name'])
     return "Hello " + args['name']
 
+#------------------------------------------------------------------------------
+# quantized image data
+
+@app.route('/sequence')
+def sequence_info():
+    arrays, meta = sequence()
+    cube = arrays['cube']
+    shapes = [arrays[f'level{n}'].shape[1:] if n > 0 else cube.shape[1:]
+              for n in range(meta['levels'])]
+    return jsonify(nframes=cube.shape[0], shape=cube.shape[1:], dtype=str(cube.dtype),
+                   levels=shapes, vmin=meta['vmin'], vmax=meta['vmax'])
+
+@app.route('/frames/<int:k>')
+def frame(k):
+    cube = level_cube()
+    if k >= len(cube):
+        abort(404)
+    return binary_response(cube[k])
+
+@app.route('/frames')
+def frames():
+    # ?start=k1&stop=k2 returns frames k1 <= k < k2 as one (n, y, x) block
+    cube = level_cube()
+    start = request.args.get('start', 0, type=int)
+    stop = min(request.args.get('stop', len(cube), type=int), len(cube))
+    if not 0 <= start < stop:
+        abort(404)
+    return binary_response(cube[start:stop])
+
+@app.route('/tiles/<int:k>/<int:level>/<int:tx>/<int:ty>')
+def tile(k, level, tx, ty):
+    # TILE_SIZE square (smaller at the edges) piece of a frame at a pyramid
+    # level, so a zoomed in client only fetches the tiles in its viewport
+    arrays, meta = sequence()
+    if not 0 <= level < meta['levels']:
+        abort(404)
+    cube = arrays[f'level{level}'] if level > 0 else arrays['cube']
+    n = TILE_SIZE
+    t = cube[k, ty*n:(ty+1)*n, tx*n:(tx+1)*n] if 0 <= k < len(cube) else cube[:0]
+    if t.size == 0 or min(tx, ty) < 0:
+        abort(404)
+    return binary_response(t)
+
+@app.route('/colormap/<name>')
+def colormap(name):
+    # (ncolors, 3) uint8 lookup table for the index data above
+    ncolors = request.args.get('ncolors', 255, type=int)
+    if not 3 <= ncolors <= 65536:
+        abort(400)
+    try:
+        return binary_response(rgb_table(name, ncolors))
+    except ValueError:
+        abort(404)
+
+# per-route timings at /metrics when PYCAT_METRICS is set
+instrument(app)
+
 if __name__ == "__main__":
     app.run(debug=True)
-
@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from arraycache import CubeCache, source_key
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def test_put_get(tmp_path):
+    cache = CubeCache(str(tmp_path))
+    cube = np.arange(24, dtype=np.uint8).reshape(2, 3, 4)
+    cache.put('key', {'cube': cube}, {'vmin': 1.5})
+
+    arrays, meta = cache.get('key')
+    assert isinstance(arrays['cube'], np.memmap)
+    assert np.array_equal(arrays['cube'], cube)
+    assert meta == {'vmin': 1.5}
+    assert cache.get('other') is None
+
+
+def test_source_key(tmp_path):
+    path = tmp_path / 'frame.fts'
+    path.write_bytes(b'1')
+    key = source_key([str(path)], top=254)
+    assert key == source_key([str(path)], top=254)
+    assert key != source_key([str(path)], top=255)
+
+    path.write_bytes(b'12')
+    assert key != source_key([str(path)], top=254)
+
+
+def test_evict_keeps_size_bound(tmp_path):
+    cache = CubeCache(str(tmp_path), maxbytes=3000)
+    for k in range(4):
+        cache.put(f'key{k}', {'cube': np.zeros(1000, dtype=np.uint8)})
+    assert sum(size for used, size, key in cache.entries()) <= 3000
+    assert cache.get('key3') is not None
+
+
+def test_sweep_stale_staging(tmp_path):
+    cache = CubeCache(str(tmp_path))
+    stale = tmp_path / f'key.tmp{dead_pid()}'
+    stale.mkdir()
+    (stale / 'cube.npy').write_bytes(b'x' * 100)
+    live = cache.staging('other')
+
+    cache.put('key', {'cube': np.zeros(3)})
+    assert not stale.exists()
+    assert os.path.isdir(live)
+    assert [key for used, size, key in cache.entries()] == ['key']
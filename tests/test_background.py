@@ -0,0 +1,68 @@
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+from background import background
+from lazycube import LazyCube
+
+
+class CountingCube(LazyCube):
+    """A lazy cube that counts how often each frame is computed"""
+
+    def __init__(self, data):
+        self.data = data
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.reads = np.zeros(len(data), dtype=int)
+
+    def frame(self, k, out=None):
+        self.reads[k] += 1
+        if out is None:
+            return self.data[k].copy()
+        out[...] = self.data[k]
+        return out
+
+
+@pytest.fixture
+def cube():
+    rng = np.random.default_rng(5)
+    cube = rng.standard_normal((9, 12, 10)).astype(np.float32)
+    cube[:, 0, 0] = np.nan
+    cube[3, 1, 1] = np.nan
+    return cube
+
+
+def nanreduce(func, a, axis):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return func(a, axis=axis)
+
+
+@pytest.mark.parametrize("method, func", [('median', np.nanmedian), ('min', np.nanmin)])
+def test_background_in_bands(cube, method, func):
+    # a band of one row at a time
+    bg = background(cube, method, maxbytes=1, nworkers=2)
+    assert np.allclose(bg, nanreduce(func, cube, 0), equal_nan=True)
+
+
+def test_windowed_background(cube, tmp_path):
+    bg = background(cube, 'median', window=3, maxbytes=1, scratch_dir=str(tmp_path))
+    assert isinstance(bg, np.memmap) and bg.shape == cube.shape
+    assert np.allclose(bg[0], nanreduce(np.nanmedian, cube[:2], 0), equal_nan=True)
+    assert np.allclose(bg[4], nanreduce(np.nanmedian, cube[3:6], 0), equal_nan=True)
+    if os.name == 'posix':
+        assert os.listdir(tmp_path) == []
+
+
+def test_lazy_cube_read_once(cube, tmp_path):
+    lazy = CountingCube(cube)
+    bg = background(lazy, 'median', maxbytes=1, scratch_dir=str(tmp_path))
+    assert np.all(lazy.reads == 1)
+    assert np.allclose(bg, nanreduce(np.nanmedian, cube, 0), equal_nan=True)
+
+
+def test_unknown_method(cube):
+    with pytest.raises(ValueError):
+        background(cube, 'mean')
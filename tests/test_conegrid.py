@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from conegrid import OutlineGrid, build_grid, outline_grid
+from coneproj import outline
+
+
+def segment_distance(points, polygon):
+    """Distance of each point to a closed polygon"""
+    a = polygon
+    d = np.roll(polygon, -1, axis=0) - a
+    t = ((points[:, None] - a)*d).sum(-1) / np.maximum((d*d).sum(-1), 1e-300)
+    nearest = a + np.clip(t, 0, 1)[..., None]*d
+    return np.sqrt(((points[:, None] - nearest)**2).sum(-1)).min(axis=1)
+
+
+def outline_error(edge, exact):
+    """Hausdorff distance between two outlines"""
+    return max(segment_distance(edge, exact).max(), segment_distance(exact, edge).max())
+
+
+@pytest.fixture(scope='module')
+def coarse_grid():
+    # a 10 degree grid, small enough to build here
+    psi_range = (1.0, 80.0)
+    center, radius = build_grid(19, 36, 12, psi_range, nvertices=64, nworkers=None)
+    return OutlineGrid(center, radius, psi_range)
+
+
+def test_grid_accuracy(coarse_grid):
+    rng = np.random.default_rng(0)
+    errors = []
+    for k in range(100):
+        cone = (rng.uniform(-80, 80), rng.uniform(0, 360), rng.uniform(5, 60))
+        edge = coarse_grid(*cone, 1.0)
+        errors.append(outline_error(edge, outline(*cone, 1.0, nvertices=1024)))
+
+    # relative to the cone length
+    errors = np.array(errors) / np.sqrt(2.0)
+    assert np.median(errors) < 0.01
+    assert errors.max() < 0.03
+
+
+def test_grid_is_continuous(coarse_grid):
+    # small steps in the parameters, across grid nodes, only move the
+    # outline a little
+    for psi in np.linspace(5.0, 60.0, 23):
+        edges = [coarse_grid(25.0, 100.0, p, 1.0) for p in (psi, psi + 0.1)]
+        assert np.abs(edges[1] - edges[0]).max() < 0.01
+    for longitude in np.linspace(0.0, 360.0, 37):
+        edges = [coarse_grid(25.0, lon, 30.0, 1.0) for lon in (longitude - 0.1, longitude + 0.1)]
+        assert np.abs(edges[1] - edges[0]).max() < 0.01
+
+
+def test_grid_scales_with_size(coarse_grid):
+    assert np.allclose(coarse_grid(30.0, 40.0, 25.0, 3.0), 3.0*coarse_grid(30.0, 40.0, 25.0, 1.0))
+
+
+def test_outline_grid_cached(tmp_path):
+    params = dict(nlat=5, nlon=8, npsi=4, nvertices=16, nworkers=None, cachedir=str(tmp_path))
+    grid = outline_grid(**params)
+    again = outline_grid(**params)
+    assert isinstance(again.radius, np.memmap)
+    assert np.array_equal(grid(10.0, 20.0, 30.0, 2.0), again(10.0, 20.0, 30.0, 2.0))
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from coneproj import cone_profile, outline, outlines, rotation_matrices
+
+CONES = [(0.0, 0.0, 30.0), (45.0, 90.0, 20.0), (-30.0, 200.0, 60.0),
+         (89.0, 10.0, 5.0), (10.0, 350.0, 75.0)]
+
+
+def surface_points(latitude, longitude, psi, a, nphi=720, nz=400):
+    """Plane-of-sky points on the surface of a cone, the slow way"""
+    z, r, slope = cone_profile(nz)
+    phi = np.linspace(0.0, 2*np.pi, nphi, endpoint=False)
+    rs = np.tan(np.radians(psi)) * r[:, None]
+    points = np.stack(np.broadcast_arrays(rs*np.cos(phi), rs*np.sin(phi), z[:, None]),
+                      axis=-1)
+    m = rotation_matrices(latitude, longitude)[0, 1:]
+    return np.sqrt(2.0) * a * points.reshape(-1, 3) @ m.T
+
+
+@pytest.mark.parametrize("latitude, longitude, psi", CONES)
+def test_outline_is_support_of_surface(latitude, longitude, psi):
+    a = 1.5
+    edge = outline(latitude, longitude, psi, a, nvertices=64)
+    points = surface_points(latitude, longitude, psi, a)
+
+    # vertex i is the extreme point of the cone in direction i
+    angle = np.linspace(0.0, 2*np.pi, 64, endpoint=False)
+    u = np.stack([np.cos(angle), np.sin(angle)], axis=1)
+    support = (points @ u.T).max(axis=0)
+    assert np.allclose((edge*u).sum(axis=1), support, atol=1e-3*a)
+
+
+def test_outlines_match_outline():
+    latitude, longitude, psi = np.array(CONES).T
+    edges = outlines(latitude, longitude, psi, 2.0, nvertices=32, chunk=2)
+    for edge, cone in zip(edges, CONES):
+        assert np.allclose(edge, outline(*cone, 2.0, nvertices=32))
+
+
+def test_outlines_broadcast():
+    psi = np.array([10.0, 20.0, 40.0])
+    a = np.array([1.0, 2.0, 3.0])
+    edges = outlines(30.0, 60.0, psi, a, nvertices=16)
+    assert edges.shape == (3, 16, 2)
+    for edge, p, s in zip(edges, psi, a):
+        assert np.allclose(edge, s * outline(30.0, 60.0, p, 1.0, nvertices=16))
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from difference import DifferenceCube
+
+
+def test_running_difference_before_step():
+    cube = np.arange(4*2*2, dtype=np.float32).reshape(4, 2, 2)
+    cube[:, 0, 0] = np.nan
+    diff = DifferenceCube(cube, 'running', step=2)
+
+    for k in (0, 1):
+        assert np.isnan(diff[k][0, 0])
+        assert np.all(diff[k].reshape(-1)[1:] == 0)
+    assert np.array_equal(diff[3], cube[3] - cube[1], equal_nan=True)
+
+
+def test_difference_modes():
+    cube = np.array([[[1.0, 2.0]], [[0.0, 6.0]], [[4.0, 8.0]]])
+    assert np.array_equal(DifferenceCube(cube, 'base', ref=1)[2], [[4.0, 2.0]])
+    ratio = DifferenceCube(cube, 'ratio', ref=1)[2]
+    assert np.isnan(ratio[0, 0]) and ratio[0, 1] == pytest.approx(8/6)
+    assert np.array_equal(DifferenceCube(cube, 'background', background=cube[0])[2],
+                          [[3.0, 6.0]])
+    with pytest.raises(ValueError):
+        DifferenceCube(cube, 'running', step=0)
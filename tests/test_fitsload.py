@@ -0,0 +1,110 @@
+import gc
+import os
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+fits = pytest.importorskip("astropy.io.fits")
+
+from fitsload import FitsCube, load_sequence, read_sequence, scratch_cube
+from stats import sequence_histogram
+
+
+def write_sequence(dir, nframes, shape=(6, 5)):
+    rng = np.random.default_rng(2)
+    cube = rng.standard_normal((nframes,) + shape).astype('>f4')
+    files = []
+    for k, frame in enumerate(cube):
+        name = f"frame{k:02d}.fts"
+        fits.PrimaryHDU(frame).writeto(dir / name)
+        files.append(name)
+    return str(dir), files, cube.astype(np.float32)
+
+
+@pytest.fixture
+def sequence(tmp_path):
+    return write_sequence(tmp_path, 12)
+
+
+def test_fits_cube_indexing(sequence):
+    dir, files, cube = sequence
+    lazy = load_sequence(dir, files)
+    assert isinstance(lazy, FitsCube)
+    assert lazy.shape == cube.shape and lazy.dtype == np.float32
+
+    assert np.array_equal(lazy[3], cube[3])
+    assert lazy[4, 2, 1] == cube[4, 2, 1]
+    assert np.array_equal(lazy[2:9:3], cube[2:9:3])
+    assert np.array_equal(lazy[1:4, 2:, :3], cube[1:4, 2:, :3])
+    assert np.array_equal(np.asarray(lazy), cube)
+
+
+def test_fits_cube_bounds_open_maps(sequence):
+    dir, files, cube = sequence
+    lazy = FitsCube([os.path.join(dir, f) for f in files], maxframes=3)
+    for k in range(len(lazy)):
+        lazy.frame(k)
+        assert len(lazy._frames) <= 3
+    assert list(lazy._frames) == [9, 10, 11]
+
+    # a hit moves the frame to the back of the queue
+    lazy.frame(9)
+    lazy.frame(0)
+    assert list(lazy._frames) == [11, 9, 0]
+
+
+def test_fits_cube_threads(tmp_path):
+    dir, files, cube = write_sequence(tmp_path, 64)
+    order = np.random.default_rng(3).integers(0, 64, size=4000)
+
+    # switch threads often, so that they interleave inside frame()
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        run_threads(dir, files, cube, order)
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def run_threads(dir, files, cube, order):
+    for maxframes in (1, 8, 64):
+        lazy = FitsCube([os.path.join(dir, f) for f in files], maxframes=maxframes)
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            frames = list(pool.map(lazy.frame, order))
+        assert all(np.array_equal(frame, cube[k]) for k, frame in zip(order, frames))
+        assert len(lazy._frames) <= maxframes
+
+        hist = sequence_histogram(lazy, nworkers=16)
+        assert hist.clip_levels() == (cube.min(), cube.max())
+
+
+def test_read_sequence(sequence, tmp_path):
+    dir, files, cube = sequence
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    parallel = read_sequence([os.path.join(dir, f) for f in files], nworkers=2,
+                             scratch_dir=str(scratch))
+    assert parallel.dtype == np.float32
+    assert np.array_equal(parallel, cube)
+    if os.name == 'posix':
+        assert os.listdir(scratch) == []
+
+
+def test_scratch_cube(tmp_path):
+    out = scratch_cube((2, 3, 4), np.uint8, scratch_dir=str(tmp_path))
+    out[...] = 7
+    assert out.shape == (2, 3, 4) and np.all(out == 7)
+    if os.name == 'posix':
+        assert os.listdir(tmp_path) == []
+
+
+def test_scratch_cube_named(tmp_path):
+    out = scratch_cube((2, 3), np.float32, scratch_dir=str(tmp_path), unlink=False)
+    path = out.filename
+    assert os.path.exists(path)
+    del out
+    gc.collect()
+    assert not os.path.exists(path)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("dash")
+
+from flask import Flask
+
+from display import DisplayTransform
+from framecache import FrameEncoder
+from playback import QUERY_LIMITS, register_frames, transform_from_query, transform_query
+
+BAD_QUERIES = ["cmap=nope", "gamma=nan", "gamma=inf", "gamma=abc", "cmin=", "ncolors=1e400"]
+
+
+@pytest.fixture
+def client():
+    cube = (np.arange(3*16*16).reshape(3, 16, 16) % 255).astype(np.uint8)
+    server = Flask(__name__)
+    register_frames(server, FrameEncoder(cube), '/frames')
+    return server.test_client()
+
+
+def test_transform_query_round_trip():
+    t = DisplayTransform(cmap='soholasco2', gamma=0.5, cmin=10, cmax=200, top=254, ncolors=64)
+    args = dict(pair.split('=') for pair in transform_query(t).split('&'))
+    assert transform_from_query(args) == t
+
+
+def test_transform_query_clamps():
+    t = transform_from_query({'gamma': '1e9', 'ncolors': '0', 'top': '70000.5'})
+    assert t.gamma == QUERY_LIMITS['gamma'][1]
+    assert t.ncolors == QUERY_LIMITS['ncolors'][0]
+    assert t.top == QUERY_LIMITS['top'][1]
+
+
+def test_frame_route(client):
+    query = transform_query(DisplayTransform())
+    resp = client.get(f'/frames/1.png?{query}')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'image/png'
+    assert resp.data.startswith(b'\x89PNG')
+
+    assert client.get(f'/frames/3.png?{query}').status_code == 404
+    assert client.get(f'/frames/0.gif?{query}').status_code == 404
+
+
+@pytest.mark.parametrize("query", BAD_QUERIES)
+def test_frame_route_rejects_bad_query(client, query):
+    assert client.get(f'/frames/0.png?{query}').status_code == 400
@@ -0,0 +1,33 @@
+import numpy as np
+
+from polar import PolarCube, to_polar
+
+
+def test_to_polar_integer_frame():
+    # a bilinear remap of a linear ramp is exact
+    y, x = np.mgrid[:65, :65]
+    frame = (3*y + 2*x).astype(np.uint16)
+    polar = to_polar(frame, npa=8)
+
+    assert polar.dtype.kind == 'f'
+    assert np.allclose(polar, to_polar(frame.astype(float), npa=8))
+
+    # position angle 0 is up (increasing rows), 90 degrees is to the left
+    r = np.arange(polar.shape[0])
+    assert np.allclose(polar[:, 0], 3*(32 + r) + 2*32)
+    assert np.allclose(polar[:, 2], 3*32 + 2*(32 - r))
+
+
+def test_to_polar_outside_is_nan():
+    frame = np.ones((32, 48), dtype=np.int32)
+    polar = to_polar(frame, npa=16, rmax=30.0)
+    # the bilinear weights are float32
+    assert np.allclose(polar[:16], 1.0)
+    assert np.isnan(polar[-1]).any()
+
+
+def test_polar_cube():
+    cube = np.arange(3*9*9, dtype=np.int16).reshape(3, 9, 9)
+    polar = PolarCube(cube, npa=12)
+    assert polar.shape == (3, 5, 12)
+    assert np.array_equal(polar[1], to_polar(cube[1], npa=12))
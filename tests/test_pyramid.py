@@ -0,0 +1,46 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from pyramid import build_pyramid, level_shape, pick_level, reduce_frame
+
+
+def test_reduce_median_matches_nanmedian():
+    rng = np.random.default_rng(4)
+    frame = rng.standard_normal((7, 9)).astype(np.float32)
+    frame[frame > 1.5] = np.nan
+
+    padded = np.pad(frame, ((0, 1), (0, 1)), constant_values=np.nan)
+    blocks = padded.reshape(4, 2, 5, 2).swapaxes(1, 2).reshape(4, 5, 4)
+    with warnings.catch_warnings():
+        # all-NaN blocks
+        warnings.simplefilter('ignore', RuntimeWarning)
+        expected = np.nanmedian(blocks, axis=-1)
+    assert np.allclose(reduce_frame(frame), expected, equal_nan=True)
+
+
+def test_reduce_ignores_infinities():
+    frame = np.array([[-np.inf, 1.0, 5.0, np.inf],
+                      [2.0, 3.0, np.nan, 6.0]])
+    assert reduce_frame(frame).tolist() == [[2.0, 5.5]]
+    assert reduce_frame(frame, method='mean').tolist() == [[2.0, 5.5]]
+
+    frame = np.array([[-np.inf, np.inf], [np.nan, -np.inf]])
+    assert np.isnan(reduce_frame(frame)).all()
+
+
+def test_reduce_mean_and_integers():
+    frame = np.arange(16, dtype=np.uint16).reshape(4, 4)
+    assert reduce_frame(frame, method='mean').tolist() == [[2.5, 4.5], [10.5, 12.5]]
+    assert reduce_frame(frame).tolist() == [[2.5, 4.5], [10.5, 12.5]]
+    with pytest.raises(ValueError):
+        reduce_frame(frame, method='max')
+
+
+def test_build_pyramid():
+    frame = np.ones((100, 60))
+    levels = build_pyramid(frame, 4)
+    assert [level.shape for level in levels] == [level_shape(frame.shape, n) for n in range(4)]
+    assert all(np.all(level == 1) for level in levels)
+    assert pick_level((4096, 4096), 1024, 4) == 2
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from radial import NRGFCube, nrgf, radial_bins
+
+
+def test_nrgf_normalizes_rings():
+    rng = np.random.default_rng(1)
+    ny, nx = 48, 64
+    y, x = np.mgrid[:ny, :nx]
+    r = np.hypot(y - (ny - 1)/2, x - (nx - 1)/2)
+    frame = 1000/(1 + r)**3 * (1 + 0.1*rng.standard_normal((ny, nx)))
+    frame[0, 0] = np.nan
+
+    out = nrgf(frame.astype(np.float32))
+    bins, n = radial_bins(frame.shape)
+    flat = out.reshape(-1)
+    for b in (5, 10, 20):
+        ring = flat[bins == b]
+        assert np.nanmean(ring) == pytest.approx(0.0, abs=1e-4)
+        assert np.nanstd(ring) == pytest.approx(1.0, rel=1e-3)
+    assert np.isnan(out[0, 0])
+
+
+def test_nrgf_flat_ring_is_nan():
+    out = nrgf(np.ones((8, 8)))
+    assert np.isnan(out).all()
+
+
+def test_radial_bins_sectors():
+    bins, n = radial_bins((5, 5), nbins=3, nsectors=4)
+    assert n == 12
+    assert bins.min() >= 0 and bins.max() < n
+    # the center is in the first ring, the corners in the last
+    assert bins[12] // 4 == 0
+    assert all(bins[i] // 4 == 2 for i in (0, 4, 20, 24))
+    # and the corners are in four different sectors
+    assert len({bins[i] % 4 for i in (0, 4, 20, 24)}) == 4
+
+
+def test_nrgf_cube():
+    cube = np.random.default_rng(6).standard_normal((2, 16, 16))
+    filtered = NRGFCube(cube, nsectors=2)
+    assert filtered.shape == cube.shape
+    assert np.array_equal(filtered[1], nrgf(cube[1], nsectors=2), equal_nan=True)
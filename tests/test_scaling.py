@@ -0,0 +1,24 @@
+import numpy as np
+
+from scaling import data_range, scale_to_uint8
+
+
+def test_scale_to_uint8_non_finite():
+    cube = np.array([[[np.nan, np.inf, -np.inf, 0.0, 0.5, 1.0, 2.0]]])
+    out = scale_to_uint8(cube, 0.0, 1.0, top=254)
+    assert out.dtype == np.uint8
+    assert out.tolist() == [[[0, 0, 0, 0, 127, 254, 254]]]
+
+
+def test_scale_to_uint8_per_frame_levels():
+    cube = np.stack([np.full((2, 2), 1.0), np.full((2, 2), 3.0)])
+    out = scale_to_uint8(cube, [0.0, 2.0], [2.0, 4.0], top=200)
+    assert np.all(out == 100)
+
+
+def test_data_range():
+    cube = np.arange(2*4*4, dtype=np.float32).reshape(2, 4, 4)
+    cube[0, 0, 0] = np.nan
+    assert data_range(cube) == (1.0, 31.0)
+    vmin, vmax = data_range(cube, per_frame=True)
+    assert list(vmin) == [1.0, 16.0] and list(vmax) == [15.0, 31.0]
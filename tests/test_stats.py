@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from stats import frame_histogram, sequence_histogram
+
+# relative width of the histogram bins
+BIN_WIDTH = 2.0**-7
+
+
+def test_percentiles_match_numpy():
+    rng = np.random.default_rng(0)
+    cube = rng.lognormal(size=(4, 64, 64)).astype(np.float32)
+    hist = sequence_histogram(cube)
+
+    # values are interpolated within a bin, so a sparse tail can be off
+    # by up to about two bin widths
+    for q in (1, 25, 50, 75, 99):
+        expected = np.percentile(cube, q)
+        assert hist.percentile(q) == pytest.approx(expected, rel=2*BIN_WIDTH)
+        assert hist.percentile(q, frame=2) == pytest.approx(np.percentile(cube[2], q),
+                                                           rel=2*BIN_WIDTH)
+
+
+def test_extremes_are_exact_and_ignore_non_finite():
+    cube = np.linspace(-5.0, 7.0, 3*16*16).reshape(3, 16, 16)
+    cube[0, 0, 0] = np.nan
+    cube[1, 0, 0] = np.inf
+    cube[2, 0, 0] = -np.inf
+    hist = sequence_histogram(cube, nworkers=2)
+
+    finite = cube[np.isfinite(cube)]
+    assert hist.clip_levels() == (finite.min(), finite.max())
+    assert list(hist.nbad) == [1, 1, 1]
+
+    vmin, vmax = hist.clip_levels(per_frame=True)
+    masked = np.where(np.isfinite(cube), cube, np.nan)
+    assert np.array_equal(vmin, np.nanmin(masked, axis=(1, 2)))
+    assert np.array_equal(vmax, np.nanmax(masked, axis=(1, 2)))
+
+
+def test_empty_frame():
+    lo, hi, offset, counts, nbad = frame_histogram(np.full((4, 4), np.nan))
+    assert np.isnan(lo) and np.isnan(hi)
+    assert counts.size == 0 and nbad == 16
+
+
+def test_sequence_histogram_stores_frames():
+    cube = np.arange(2*3*3, dtype=np.float32).reshape(2, 3, 3)
+    out = np.zeros_like(cube)
+    sequence_histogram(cube, out=out)
+    assert np.array_equal(out, cube)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("dash")
+
+from flask import Flask
+
+from display import DisplayTransform
+from playback import transform_query
+from tiles import TileEncoder, _relayout_view, register_tiles
+
+BAD_QUERIES = ["cmap=nope", "gamma=nan", "gamma=abc", "cmin="]
+
+
+@pytest.fixture
+def encoder():
+    cube = (np.arange(3*20*16).reshape(3, 20, 16) % 255).astype(np.uint8)
+    return TileEncoder([cube, cube[:, ::2, ::2]], tile_size=8)
+
+
+@pytest.fixture
+def client(encoder):
+    server = Flask(__name__)
+    register_tiles(server, encoder, '/tiles')
+    return server.test_client()
+
+
+def test_tile_geometry(encoder):
+    assert encoder.shape == (20, 16)
+    assert encoder.ntiles(0) == (3, 2)
+    assert encoder.ntiles(1) == (2, 1)
+    assert encoder.tile(0, 0, 1, 2).shape == (4, 8)
+    assert encoder.visible(0, 0, 8, 0, 9) == [(0, 0), (0, 1)]
+    assert encoder.visible(1, -5, 100, -5, 100) == [(0, 0), (0, 1)]
+
+
+def test_tile_route(client):
+    query = transform_query(DisplayTransform())
+    resp = client.get(f'/tiles/0/0/1/1.jpg?{query}')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'image/jpeg'
+
+    assert client.get(f'/tiles/0/1/1/0.png?{query}').status_code == 404
+    assert client.get(f'/tiles/0/2/0/0.png?{query}').status_code == 404
+    assert client.get(f'/tiles/3/0/0/0.png?{query}').status_code == 404
+
+
+@pytest.mark.parametrize("query", BAD_QUERIES)
+def test_tile_route_rejects_bad_query(client, query):
+    assert client.get(f'/tiles/0/0/0/0.png?{query}').status_code == 400
+
+
+def test_relayout_view():
+    shape = (100, 200)
+    view = (10, 20, 30, 40)
+    assert _relayout_view(None, view, shape) == view
+    assert _relayout_view({'autosize': True}, view, shape) == (0, 200, 0, 100)
+
+    # the y axis is reversed
+    zoom = {'xaxis.range[0]': 5, 'xaxis.range[1]': 50, 'yaxis.range[0]': 60, 'yaxis.range[1]': 20}
+    assert _relayout_view(zoom, view, shape) == (5, 50, 20, 60)
+    assert _relayout_view({'xaxis.range': [7, 3]}, view, shape) == (3, 7, 30, 40)
+    assert _relayout_view({'xaxis.autorange': True, 'yaxis.autorange': True},
+                          view, shape) == (0, 200, 0, 100)
+    assert _relayout_view({'dragmode': 'pan'}, view, shape) == view
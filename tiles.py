@@ -0,0 +1,255 @@
+"""
+Tiled zoom and pan viewing of full resolution frames.
+
+The frames of an image pyramid (see pyramid.py) are cut into fixed size
+tiles addressed by (frame, level, tx, ty), where level 0 is the full
+resolution and tx, ty count tiles from the top left corner.  Tiles are
+colorized and encoded only when they are first requested, and then kept
+in a FrameCache, so a viewer zoomed into part of a frame transfers just
+the few tiles that cover its viewport instead of the whole frame.
+
+Usage:
+
+    encoder = TileEncoder([arrays['cube'], arrays['level1'], ...])
+    register_tiles(app.server, encoder, '/tiles')
+    app.layout = html.Div([..., tiled_layout('zoom', encoder, '/tiles')])
+    register_tiled_view(app, 'zoom', encoder, '/tiles')
+"""
+
+import math
+
+from urllib.parse import parse_qsl
+
+import plotly.graph_objects as go
+
+from dash import dcc, html
+from dash.dependencies import Input, Output, State
+from flask import Response, abort, request
+from werkzeug.datastructures import MultiDict
+
+from display import DisplayTransform, apply_display
+from framecache import MIME_TYPES, FrameCache, encode_image
+from playback import transform_from_query, transform_query
+from pyramid import pick_level
+
+# tile edge in pixels
+TILE_SIZE = 256
+
+#------------------------------------------------------------------------------
+class TileEncoder:
+    """
+    Encode tiles of a pyramid of quantized (time, y, x) cubes through
+    display transforms, caching the results.  levels[0] is the full
+    resolution cube and levels[n] is reduced by 2**n.  codec_level is the
+    compression level or quality passed on to encode_image().
+    """
+
+    def __init__(self, levels, cache=None, name=None, tile_size=TILE_SIZE,
+                 codec_level=None):
+        self.levels = levels
+        self.cache = cache if cache is not None else FrameCache()
+        self.name = name if name is not None else id(levels)
+        self.tile_size = tile_size
+        self.codec_level = codec_level
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    @property
+    def shape(self):
+        """Full resolution frame shape (y, x)"""
+        return self.levels[0].shape[1:]
+
+    def ntiles(self, level):
+        """Number of tiles (ny, nx) at a pyramid level"""
+        ny, nx = self.levels[level].shape[1:]
+        return -(-ny // self.tile_size), -(-nx // self.tile_size)
+
+    def tile(self, k, level, tx, ty):
+        """The (view of the) uint8 indices of a tile"""
+        n = self.tile_size
+        return self.levels[level][k, ty*n:(ty+1)*n, tx*n:(tx+1)*n]
+
+    def encode(self, k, level, tx, ty, transform, codec='png'):
+        """Return tile (tx, ty) of frame k at a level, encoded with codec"""
+        key = (self.name, k, level, tx, ty, transform, codec)
+        data = self.cache.get(key)
+        if data is None:
+            rgb = apply_display(self.tile(k, level, tx, ty), transform)
+            data = encode_image(rgb, codec=codec, level=self.codec_level)
+            self.cache.put(key, data)
+        return data
+
+    def visible(self, level, x0, x1, y0, y1):
+        """
+        The tiles (tx, ty) at a level that overlap the region x0 <= x < x1,
+        y0 <= y < y1 given in full resolution pixels
+        """
+        n = self.tile_size * 2**level
+        nty, ntx = self.ntiles(level)
+        txs = range(max(int(x0 // n), 0), min(int(math.ceil(x1 / n)), ntx))
+        tys = range(max(int(y0 // n), 0), min(int(math.ceil(y1 / n)), nty))
+        return [(tx, ty) for ty in tys for tx in txs]
+
+#------------------------------------------------------------------------------
+def tile_url(prefix, k, level, tx, ty, t, codec='png'):
+    return f"{prefix}/{k}/{level}/{tx}/{ty}.{codec}?{transform_query(t)}"
+
+def register_tiles(server, encoder, prefix='/tiles', max_age=3600):
+    """
+    Serve the tiles of a TileEncoder from a Flask server at
+    prefix/<k>/<level>/<tx>/<ty>.png (or .jpg), with the display
+    transform in the query string (400 if it is invalid).
+    """
+
+    def tile(k, level, tx, ty, codec):
+        if codec not in MIME_TYPES or not 0 <= k < len(encoder) \
+           or not 0 <= level < len(encoder.levels):
+            abort(404)
+        nty, ntx = encoder.ntiles(level)
+        if not (0 <= tx < ntx and 0 <= ty < nty):
+            abort(404)
+        try:
+            t = transform_from_query(request.args)
+        except ValueError:
+            abort(400)
+        resp = Response(encoder.encode(k, level, tx, ty, t, codec),
+                        mimetype=MIME_TYPES[codec])
+        resp.cache_control.max_age = max_age
+        resp.cache_control.public = True
+        return resp
+
+    server.add_url_rule(f"{prefix}/<int:k>/<int:level>/<int:tx>/<int:ty>.<codec>",
+                        endpoint=f"tiles{prefix}", view_func=tile)
+
+#------------------------------------------------------------------------------
+def tile_images(encoder, prefix, k, view, transform, height=800, codec='png'):
+    """
+    Layout images covering the view (x0, x1, y0, y1) in full resolution
+    pixels of frame k, at the pyramid level that matches a graph of the
+    given height in pixels
+    """
+    x0, x1, y0, y1 = view
+    level = pick_level((y1 - y0, x1 - x0), height, len(encoder.levels))
+    size = encoder.tile_size * 2**level
+
+    images = []
+    for tx, ty in encoder.visible(level, x0, x1, y0, y1):
+        ny, nx = encoder.tile(k, level, tx, ty).shape
+        images.append({
+            "source": tile_url(prefix, k, level, tx, ty, transform, codec),
+            "xref": "x", "yref": "y",
+            "x": tx*size, "y": ty*size,
+            "sizex": nx * 2**level, "sizey": ny * 2**level,
+            "sizing": "stretch", "layer": "below",
+        })
+    return images
+
+def tiled_figure(encoder, height=800):
+    """An empty figure with axes in full resolution pixels, for tile images"""
+    ny, nx = encoder.shape
+    fig = go.Figure(go.Scatter(x=[0, nx], y=[0, ny], mode='markers',
+                               marker={'opacity': 0}, hoverinfo='skip'))
+    fig.update_layout({
+        "xaxis": {
+            "range": [0, nx],
+            "scaleanchor": "y",
+            "showgrid": False,
+            "zeroline": False,
+            "visible": False,
+        },
+        "yaxis": {
+            # image rows run downwards
+            "range": [ny, 0],
+            "showgrid": False,
+            "zeroline": False,
+            "visible": False,
+        },
+        "showlegend": False,
+        "height": height,
+        "margin": {'t': 10, 'b': 10, 'l': 10, 'r': 10},
+        "paper_bgcolor": "black",
+        "plot_bgcolor": "black",
+        # keep zoom and pan while the tiles change
+        "uirevision": "tiles",
+    })
+    return fig
+
+def tiled_layout(id, encoder, prefix='/tiles', transform=DisplayTransform(), height=800):
+    """
+    Components for a zoomable frame viewer: the graph (id), a frame
+    slider, a store (id-view) with the visible region and a store
+    (id-transform) holding the display transform as a query string.
+    """
+    ny, nx = encoder.shape
+    view = (0, nx, 0, ny)
+
+    fig = tiled_figure(encoder, height)
+    fig.update_layout(images=tile_images(encoder, prefix, 0, view, transform, height))
+
+    return html.Div([
+        dcc.Graph(
+            id = id,
+            figure = fig,
+            config = {"displayModeBar": False, "scrollZoom": True},
+        ),
+        dcc.Slider(
+            id = f"{id}-frame",
+            min = 0,
+            max = len(encoder) - 1,
+            step = 1,
+            value = 0,
+            marks = None,
+            tooltip = {"placement": "bottom"},
+        ),
+        dcc.Store(id=f"{id}-view", data=view),
+        dcc.Store(id=f"{id}-transform", data=transform_query(transform)),
+    ])
+
+def _axis_range(relayout, axis, old, full):
+    # (lo, hi) of an axis after a relayout event, which plotly sends as
+    # axis.range[0] and axis.range[1], as a list axis.range, or as
+    # axis.autorange to zoom out
+    if relayout.get(f'{axis}.autorange'):
+        return full
+    r0, r1 = relayout.get(f'{axis}.range', (None, None))
+    r0 = relayout.get(f'{axis}.range[0]', r0)
+    r1 = relayout.get(f'{axis}.range[1]', r1)
+    r0 = old[0] if r0 is None else r0
+    r1 = old[1] if r1 is None else r1
+    return min(r0, r1), max(r0, r1)
+
+def _relayout_view(relayout, view, shape):
+    # the visible region after a zoom/pan event, or the old one
+    ny, nx = shape
+    if relayout is None:
+        return view
+    if relayout.get('autosize'):
+        return (0, nx, 0, ny)
+    x0, x1, y0, y1 = view
+    # the y axis is reversed, which min/max undoes
+    x0, x1 = _axis_range(relayout, 'xaxis', (x0, x1), (0, nx))
+    y0, y1 = _axis_range(relayout, 'yaxis', (y0, y1), (0, ny))
+    return (x0, x1, y0, y1)
+
+def register_tiled_view(app, id, encoder, prefix='/tiles', height=800, codec='png'):
+    """
+    Wire up the components of tiled_layout(id, ...): zooming, panning or
+    moving the slider replaces the layout images by the tiles in view
+    """
+
+    @app.callback(
+        Output(id, 'figure'),
+        Output(f"{id}-view", 'data'),
+        Input(id, 'relayoutData'),
+        Input(f"{id}-frame", 'value'),
+        Input(f"{id}-transform", 'data'),
+        State(f"{id}-view", 'data'),
+        State(id, 'figure'),
+    )
+    def update_tiles(relayout, k, query, view, figure):
+        view = _relayout_view(relayout, view, encoder.shape)
+        t = transform_from_query(MultiDict(parse_qsl(query)))
+        figure['layout']['images'] = tile_images(encoder, prefix, k, view, t,
+                                                 height, codec)
+        return figure, view
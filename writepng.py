@@ -2,33 +2,12 @@
 This builds off of app3.py but it's an attempt to store the plot data in a buffer and only modify the data component of the figure, fig.frames[0].data[:].z), instead of redrawing the entire figure each time.  Currently I only know how to go about this with binary_string=False.  But even then it does not seem to be working.
 """
 
-from astropy.io import fits
 from skimage.io import imsave
 import numpy as np
-import matplotlib.pyplot as plt
-import sunpy.visualization.colormaps as cm
 
-#------------------------------------------------------------------------------
-def matplotlib_to_rgb(cmap, ncolors):
-    h = 1.0/(ncolors-2)
-
-    rgbmap = np.zeros((ncolors,3), dtype=np.uint8)
-
-    for k in range(ncolors):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        rgbmap[k,:] = (C[0], C[1], C[2])
-
-    return rgbmap
-
-def matplotlib_to_plotly(cmap, ncolors):
-    h = 1.0/(ncolors-1)
-    pl_colorscale = []
-
-    for k in range(ncolors):
-        C = list(map(np.uint8, np.array(cmap(k*h)[:3])*255))
-        pl_colorscale.append([k*h, 'rgb'+str((C[0], C[1], C[2]))])
-
-    return pl_colorscale
+from colorize import colorize
+from colortables import plotly_scale, rgb_table
+from cubecache import scaled_sequence
 
 #------------------------------------------------------------------------------
 # load image data
@@ -47,21 +26,13 @@ files = [
     "STEREOA_L3_2012_09_16_143900.fts"
 ]
 
-imagelist = []
-for f in files:
-    fname = dir + '/' + f
-    hdu = fits.open(fname)[0]
-    imagelist.append(hdu.data)
-
-images = np.array(imagelist)
-
 #------------------------------------------------------------------------------
-# load scaled data
+# load scaled data, cached on disk between runs
 
-vmin = np.min(images)
-vmax = np.max(images)
+arrays, meta = scaled_sequence(dir, files, top=254)
 
-norm = 1.0/(vmax-vmin)
+basedata = arrays['cube']
+vmin, vmax = meta['vmin'], meta['vmax']
 
 # used to reset the color scale
 baseidx = np.arange(256)
@@ -69,9 +40,8 @@ baseidx = np.arange(256)
 #------------------------------------------------------------------------------
 # lasco/C2 color scale
 
-cmap_lasco = plt.get_cmap('soholasco2')
-rgb_lasco = matplotlib_to_rgb(cmap_lasco, 255)
-cscale_lasco = matplotlib_to_plotly(cmap_lasco,255)
+rgb_lasco = rgb_table('soholasco2', 255)
+cscale_lasco = plotly_scale('soholasco2', 255)
 
 #------------------------------------------------------------------------------
 # generate original figure
@@ -82,20 +52,18 @@ cscale_lasco = matplotlib_to_plotly(cmap_lasco,255)
 # which greatly speeds up the rendering
 
 # buffer for storing
-rgb = np.zeros((images.shape[0],images.shape[1],images.shape[2],3),
+rgb = np.zeros(basedata.shape + (3,),
                 dtype=np.uint8)
 
-basedata = (254*norm*(images - vmin)).astype(np.uint8)
-for idx, val in np.ndenumerate(basedata):
-    rgb[idx[0],idx[1],idx[2],:] = rgb_lasco[val,:]
+colorize(basedata, rgb_lasco, out=rgb)
 
 #------------------------------------------------------------------------------
 
 outdir = './data/images/'
 
-nt = images.shape[0]
-nx = images.shape[1]
-ny = images.shape[2]
+nt = basedata.shape[0]
+nx = basedata.shape[1]
+ny = basedata.shape[2]
 
 im = np.zeros((nx,ny,3))
 